@@ -65,8 +65,8 @@ class OllamaIntentApp:
         self.logger.info(f"测试与Ollama API的连接: {settings.api_url}")
         self.logger.info(f"测试模型: {settings.model_name}")
         
-        client = OllamaClient(settings.api_url)
-        available, error_msg = client.check_model_available(settings.model_name)
+        with OllamaClient(settings.api_url, timeout=settings.timeout) as client:
+            available, error_msg = client.check_model_available(settings.model_name)
         
         if available:
             self.logger.info(f"成功连接到Ollama API，模型 {settings.model_name} 可用")
@@ -157,6 +157,7 @@ class OllamaIntentApp:
         self.logger.info(f"  - 输出目录: {settings.output_dir}")
         self.logger.info(f"  - 是否生成报告: {settings.generate_report}")
         self.logger.info(f"  - 是否自动打开报告: {settings.open_report}")
+        self.logger.info(f"  - 是否压缩报告: {settings.compress_report}")
         self.logger.info("=" * 50)
         
         # 创建报告服务
@@ -167,12 +168,16 @@ class OllamaIntentApp:
             summary=summary,
             system_prompt=self.system_prompt,
             metrics=metrics,
-            dataset_file=self.dataset_file
+            dataset_file=self.dataset_file,
+            compress=settings.compress_report
         )
         
         if report_file:
             self.logger.info(f"报告已生成: {report_file}")
-            if settings.open_report:
+            if settings.open_report and settings.compress_report:
+                # 浏览器不会直接渲染本地的.gz文件
+                self.logger.warning("压缩后的报告无法直接在浏览器中打开，请解压后查看")
+            elif settings.open_report:
                 self.logger.info("正在浏览器中打开报告...")
                 open_report_in_browser(report_file)
         else:
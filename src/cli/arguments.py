@@ -28,6 +28,8 @@ def parse_arguments() -> argparse.Namespace:
                       help="top-p参数，控制输出的多样性，较低的值会使模型更保守，默认为0.9")
     parser.add_argument("--precision-bias", type=float, default=0.0,
                       help="精确度偏差值，正值偏向非指令(降低假正例)，负值偏向指令，范围-1.0到1.0，默认为0")
+    parser.add_argument("--num-keep", type=int, default=None,
+                      help="上下文滑动时保留的开头token数（Ollama的num_keep参数），可设为系统提示词的token数以保留其KV缓存")
     
     # 输入设置
     parser.add_argument("--system-prompt-file", type=str, 
@@ -44,6 +46,10 @@ def parse_arguments() -> argparse.Namespace:
                       help="输出目录")
     parser.add_argument("--delay", type=float, default=0.1, 
                       help="请求之间的延迟（秒）")
+    parser.add_argument("--adaptive-delay", action="store_true",
+                      help="自适应调整请求间隔：从0开始，请求失败时加倍，连续成功时减半")
+    parser.add_argument("--workers", "--concurrency", dest="workers", type=int, default=None,
+                      help="同时处理的最大提示词数量（并发请求数），默认为min(8, 提示词数量)")
     
     # 功能开关
     parser.add_argument("--no-summary", action="store_true", 
@@ -56,6 +62,14 @@ def parse_arguments() -> argparse.Namespace:
                       help="不生成HTML报告")
     parser.add_argument("--open-report", action="store_true", 
                       help="生成报告后自动在浏览器中打开")
+    parser.add_argument("--compress-report", action="store_true",
+                      help="将报告保存为gzip压缩的report.html.gz")
+    parser.add_argument("--aggregate", action="store_true",
+                      help="响应只汇总写入摘要文件，不再为每个提示词单独保存响应文件")
+    parser.add_argument("--pretty-responses", action="store_true",
+                      help="以缩进格式保存响应文件（默认使用紧凑格式）")
+    parser.add_argument("--compact-summary", action="store_true",
+                      help="以紧凑格式保存summary.json（默认使用缩进格式）")
     
     # 日志设置
     parser.add_argument("--log-level", type=str, default="INFO", 
@@ -86,11 +100,17 @@ def update_settings_from_args(args: argparse.Namespace) -> None:
     settings.temperature = args.temperature
     settings.top_p = args.top_p
     settings.precision_bias = args.precision_bias
+    if args.num_keep is not None:
+        settings.num_keep = args.num_keep
     
     # 更新输出设置
     if args.output_dir:
         settings.output_dir = args.output_dir
     settings.delay = args.delay
+    if args.adaptive_delay:
+        settings.adaptive_delay = True
+    if args.workers is not None:
+        settings.workers = args.workers
     
     # 更新数据集文件路径
     if args.dataset_file:
@@ -102,6 +122,14 @@ def update_settings_from_args(args: argparse.Namespace) -> None:
     settings.save_raw_response = args.save_raw
     settings.generate_report = not args.no_report
     settings.open_report = args.open_report
+    if args.compress_report:
+        settings.compress_report = True
+    if args.aggregate:
+        settings.aggregate_responses = True
+    if args.pretty_responses:
+        settings.pretty_responses = True
+    if args.compact_summary:
+        settings.pretty_summary = False
     
     # 设置输入文件夹路径（如果提供）
     if args.inputs_folder:
@@ -79,6 +79,7 @@ class Settings:
         self.api_url: str = _get_env('OLLAMA_API_URL', "http://localhost:11434")
         self.api_endpoint: str = f"{self.api_url}/api/chat"
         self.timeout: int = _get_env('OLLAMA_TIMEOUT', 60, int)
+        self.max_retry_delay: float = _get_env('MAX_RETRY_DELAY', 60.0, float)  # 按Retry-After重试前最多等待的秒数
         
         # 模型设置
         self.model_name: str = _get_env('OLLAMA_MODEL', "qwen2.5-coder:3b")
@@ -86,12 +87,15 @@ class Settings:
         self.top_p: float = _get_env('MODEL_TOP_P', 0.9, float)
         self.precision_bias: float = _get_env('PRECISION_BIAS', 0.0, float)
         self.keep_alive: str = _get_env('KEEP_ALIVE', "5m")
+        self.num_keep: int = _get_env('NUM_KEEP', 0, int)  # 上下文滑动时保留的开头token数，0表示使用模型默认值
         self.model_options: Dict[str, Any] = {}
         
         # 输入/输出设置
         self.output_dir: str = _get_env('OUTPUT_DIR', "outputs")
         self.input_dir: str = _get_env('INPUT_DIR', "inputs")
         self.delay: float = _get_env('DELAY', 0.1, float)
+        self.adaptive_delay: bool = _get_env('ADAPTIVE_DELAY', False, _parse_bool)  # 根据请求成败自动调整请求间隔
+        self.workers: int = _get_env('WORKERS', 0, int)  # 0表示自动选择：min(8, 提示词数量)
         self.dataset_file: Optional[str] = _get_env('DATASET_FILE', "data/dataset.json")
         
         # 功能开关
@@ -100,6 +104,10 @@ class Settings:
         self.save_raw_response: bool = _get_env('SAVE_RAW_RESPONSE', False, _parse_bool)
         self.generate_report: bool = _get_env('GENERATE_REPORT', True, _parse_bool)
         self.open_report: bool = _get_env('OPEN_REPORT', False, _parse_bool)
+        self.compress_report: bool = _get_env('COMPRESS_REPORT', False, _parse_bool)  # 报告输出为gzip压缩的report.html.gz
+        self.aggregate_responses: bool = _get_env('AGGREGATE_RESPONSES', False, _parse_bool)  # 响应只写入摘要，不单独保存文件
+        self.pretty_responses: bool = _get_env('PRETTY_RESPONSES', False, _parse_bool)  # 响应文件是否使用缩进格式
+        self.pretty_summary: bool = _get_env('PRETTY_SUMMARY', True, _parse_bool)  # summary.json是否使用缩进格式
         
         # 日志设置
         self.log_level: str = _get_env('LOG_LEVEL', "INFO")
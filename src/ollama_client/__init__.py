@@ -4,6 +4,6 @@
 Ollama客户端模块初始化文件
 """
 
-from .client import OllamaClient
+from .client import OllamaClient, OllamaException
 
-__all__ = ["OllamaClient"] 
\ No newline at end of file
+__all__ = ["OllamaClient", "OllamaException"] 
\ No newline at end of file
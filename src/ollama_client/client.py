@@ -13,30 +13,166 @@ from typing import Any, Dict, List, Optional, Tuple, Union, AsyncIterator
 
 import requests
 import aiohttp
+from urllib3.util.retry import Retry
+
+from src.utils.json_utils import dumps_bytes, loads
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 请求体模板中用户提示词的占位符
+_USER_CONTENT_SENTINEL = "\x00__ollama_user_content__\x00"
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _build_options(options_json: Optional[bytes], temperature: float, top_p: float) -> Dict[str, Any]:
+    """合并额外模型参数与温度、top-p参数
+
+    Args:
+        options_json: 序列化后的额外模型参数，没有时为None
+        temperature: 温度参数
+        top_p: top-p参数
+
+    Returns:
+        模型参数字典
+    """
+    options = loads(options_json) if options_json else {}
+    options["temperature"] = temperature
+    options["top_p"] = top_p
+    return options
+
+
+def _build_messages(system_prompt: Optional[str], prompt: str) -> List[Dict[str, str]]:
+    """构建消息列表
+
+    Args:
+        system_prompt: 系统提示词
+        prompt: 用户提示词
+
+    Returns:
+        消息列表
+    """
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _parse_retry_after(headers: Optional[Any], max_delay: float) -> float:
+    """解析响应头中的Retry-After（秒数形式）
+
+    Args:
+        headers: 响应头，可能为None
+        max_delay: 等待时间上限(秒)，避免服务端返回过大的值使请求长时间停滞
+
+    Returns:
+        建议等待的秒数，不超过max_delay；缺失或无法解析时返回0
+    """
+    if not headers:
+        return 0.0
+    try:
+        return min(max(float(headers.get("Retry-After", 0)), 0.0), max_delay)
+    except (TypeError, ValueError):
+        # HTTP日期形式的Retry-After不常见，直接使用指数退避
+        return 0.0
+
+
+@lru_cache(maxsize=16)
+def _payload_template(model: str,
+                      system_prompt: Optional[str],
+                      stream: bool,
+                      keep_alive: str,
+                      temperature: float,
+                      top_p: float,
+                      options_json: Optional[bytes]) -> Optional[Tuple[bytes, bytes]]:
+    """构建并缓存请求体模板，按用户提示词位置切分为前后两段
+
+    同一次运行中模型、系统提示词和参数通常不变，缓存后每次请求只需序列化用户提示词，
+    不必重复编码可能很长的系统提示词和参数字典。
+
+    Args:
+        model: 模型名称
+        system_prompt: 系统提示词
+        stream: 是否流式返回
+        keep_alive: 模型在内存中保持加载的时间
+        temperature: 温度参数
+        top_p: top-p参数
+        options_json: 序列化后的额外模型参数，没有时为None
+
+    Returns:
+        (前缀, 后缀)字节串；系统提示词中恰好包含占位符时返回None
+    """
+    payload = {
+        "model": model,
+        "messages": _build_messages(system_prompt, _USER_CONTENT_SENTINEL),
+        "stream": stream,
+        "keep_alive": keep_alive,
+        "options": _build_options(options_json, temperature, top_p),
+    }
+    parts = dumps_bytes(payload).split(dumps_bytes(_USER_CONTENT_SENTINEL))
+    if len(parts) != 2:
+        return None
+    return parts[0], parts[1]
+
 
 class OllamaException(Exception):
     """Ollama API调用异常类"""
-    pass
+    
+    def __init__(self, message: str = "", overloaded: bool = False):
+        """初始化异常
+
+        Args:
+            message: 错误信息
+            overloaded: 是否为服务端过载（429/5xx或请求超时）导致的失败
+        """
+        super().__init__(message)
+        self.overloaded = overloaded
+
+
+def _is_overload_error(error: BaseException) -> bool:
+    """判断请求失败是否由服务端过载引起（429/5xx或请求超时）
+
+    Args:
+        error: 请求失败时捕获的异常
+
+    Returns:
+        服务端过载时返回True，请求本身有误（如400/404）或响应无法解析时返回False
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    return isinstance(error, aiohttp.ClientResponseError) and (error.status == 429 or error.status >= 500)
 
 
 class OllamaClient:
     """Ollama API客户端类"""
     
-    def __init__(self, base_url: str = "http://localhost:11434", timeout: int = 60):
+    def __init__(self, base_url: str = "http://localhost:11434", timeout: int = 60, max_connections: int = 100,
+                 max_retry_delay: float = 60.0):
         """初始化Ollama客户端
 
         Args:
             base_url: Ollama API的基础URL，默认为本地地址
             timeout: API请求超时时间(秒)，默认60秒
+            max_connections: 异步会话的最大并发连接数，默认100
+            max_retry_delay: 按Retry-After等待的最长时间(秒)，默认60秒
         """
         self.base_url = base_url
         self.api_endpoint = f"{base_url}/api/chat"
         self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retry_delay = max_retry_delay
         self._session = None  # 用于异步请求的会话对象
+        # 同步请求复用同一个会话，保持与Ollama服务的长连接，避免每次请求重新建立TCP连接
+        self.http_session = requests.Session()
+        # 仅对建立连接失败做有限重试（如Ollama刚启动），POST请求不会因读超时被重复发送
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.2)
+        )
+        self.http_session.mount("http://", adapter)
+        self.http_session.mount("https://", adapter)
         
     async def get_session(self) -> aiohttp.ClientSession:
         """获取或创建异步会话
@@ -45,7 +181,10 @@ class OllamaClient:
             aiohttp客户端会话对象
         """
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
         return self._session
         
     async def close_session(self) -> None:
@@ -53,6 +192,10 @@ class OllamaClient:
         if self._session and not self._session.closed:
             await self._session.close()
             self._session = None
+
+    def close(self) -> None:
+        """关闭同步会话，释放连接池"""
+        self.http_session.close()
     
     def __enter__(self):
         """支持上下文管理器模式"""
@@ -60,6 +203,7 @@ class OllamaClient:
         
     def __exit__(self, exc_type, exc_val, exc_tb):
         """退出上下文管理器"""
+        self.close()
         return False
         
     async def __aenter__(self):
@@ -72,6 +216,44 @@ class OllamaClient:
         await self.close_session()
         return False
         
+    def _encode_payload(self,
+                        model: str,
+                        prompt: str,
+                        system_prompt: Optional[str],
+                        stream: bool,
+                        keep_alive: str,
+                        temperature: float,
+                        top_p: float,
+                        options: Optional[Dict[str, Any]]) -> bytes:
+        """编码请求体，复用缓存的模板，只序列化用户提示词
+
+        Args:
+            model: 模型名称
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            stream: 是否流式返回
+            keep_alive: 模型在内存中保持加载的时间
+            temperature: 温度参数
+            top_p: top-p参数
+            options: 额外的模型参数
+
+        Returns:
+            JSON编码的请求体
+        """
+        # 没有额外参数时（最常见的情况）无需序列化参数字典即可命中缓存
+        options_json = dumps_bytes(options) if options else None
+        template = _payload_template(model, system_prompt, stream, keep_alive, temperature, top_p, options_json)
+        if template is None:
+            return dumps_bytes({
+                "model": model,
+                "messages": _build_messages(system_prompt, prompt),
+                "stream": stream,
+                "keep_alive": keep_alive,
+                "options": _build_options(options_json, temperature, top_p),
+            })
+        prefix, suffix = template
+        return prefix + dumps_bytes(prompt) + suffix
+
     def generate(self, 
                 model: str, 
                 prompt: str, 
@@ -105,52 +287,25 @@ class OllamaClient:
         Raises:
             OllamaException: 当API调用失败时抛出异常
         """
-        # 构建消息列表
-        messages = []
-        
-        # 添加系统提示词
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
-        
-        # 添加用户提示词
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
-        
-        # 构建请求负载
-        payload = {
-            "model": model,
-            "messages": messages,
-            "stream": False,
-            "keep_alive": keep_alive
-        }
-
-        # 添加温度参数
-        if options is None:
-            options = {}
-        options["temperature"] = temperature
-        options["top_p"] = top_p
-            
-        # 如果有其他选项，添加到payload
-        if options:
-            payload["options"] = options
+        # 构建请求体，系统提示词和模型参数部分来自缓存的模板
+        data = self._encode_payload(
+            model, prompt, system_prompt, False, keep_alive, temperature, top_p, options
+        )
         
         logger.debug(f"调用Ollama API，模型: {model}, 温度: {temperature}, top_p: {top_p}, 精确度偏差: {precision_bias}")
         
         # 使用重试机制
         for attempt in range(retry_count):
             try:
-                response = requests.post(
+                response = self.http_session.post(
                     self.api_endpoint, 
-                    json=payload, 
+                    data=data, 
+                    headers=_JSON_HEADERS,
                     timeout=self.timeout
                 )
                 response.raise_for_status()
-                result = response.json()
+                # 直接用orjson解析响应字节，不经过requests基于标准库json的response.json()
+                result = loads(response.content)
                 
                 # 根据参数决定返回内容
                 if return_full_response:
@@ -169,7 +324,8 @@ class OllamaClient:
                     logger.warning("API响应中未找到预期的回复内容")
                     return ""
                     
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+                # 响应体不是合法JSON时与response.json()一样按请求失败处理
                 logger.warning(f"API调用失败(尝试 {attempt+1}/{retry_count}): {e}")
                 
                 if attempt < retry_count - 1:
@@ -196,7 +352,8 @@ class OllamaClient:
                           options: Optional[Dict[str, Any]] = None, 
                           keep_alive: str = "5m",
                           retry_count: int = 3,
-                          retry_delay: float = 1.0) -> Any:
+                          retry_delay: float = 1.0,
+                          timeout: Optional[float] = None) -> Any:
         """异步调用Ollama模型生成回复
 
         Args:
@@ -211,6 +368,7 @@ class OllamaClient:
             keep_alive: 模型在内存中保持加载的时间，默认为5分钟
             retry_count: 请求失败时的重试次数，默认为3次
             retry_delay: 请求失败时的重试延迟时间(秒)，默认为1秒
+            timeout: 本次请求的总超时时间(秒)，默认为None，使用会话的超时设置
 
         Returns:
             如果return_full_response为True，返回完整的API响应；否则只返回回复文本
@@ -218,50 +376,25 @@ class OllamaClient:
         Raises:
             OllamaException: 当API调用失败时抛出异常
         """
-        # 构建消息列表
-        messages = []
-        
-        # 添加系统提示词
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
-        
-        # 添加用户提示词
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
-        
-        # 构建请求负载
-        payload = {
-            "model": model,
-            "messages": messages,
-            "stream": False,
-            "keep_alive": keep_alive
-        }
-
-        # 添加温度参数
-        if options is None:
-            options = {}
-        options["temperature"] = temperature
-        options["top_p"] = top_p
-            
-        # 如果有其他选项，添加到payload
-        if options:
-            payload["options"] = options
+        # 构建请求体，系统提示词和模型参数部分来自缓存的模板
+        data = self._encode_payload(
+            model, prompt, system_prompt, False, keep_alive, temperature, top_p, options
+        )
         
         logger.debug(f"异步调用Ollama API，模型: {model}, 温度: {temperature}, top_p: {top_p}, 精确度偏差: {precision_bias}")
         
         session = await self.get_session()
+        # 未指定时不传timeout参数，aiohttp会把timeout=None视为不限时，而不是使用会话的设置
+        request_kwargs: Dict[str, Any] = {"data": data, "headers": _JSON_HEADERS}
+        if timeout is not None:
+            request_kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
         
         # 使用重试机制
         for attempt in range(retry_count):
             try:
-                async with session.post(self.api_endpoint, json=payload) as response:
+                async with session.post(self.api_endpoint, **request_kwargs) as response:
                     response.raise_for_status()
-                    result = await response.json()
+                    result = await response.json(loads=loads)
                     
                     # 根据参数决定返回内容
                     if return_full_response:
@@ -280,21 +413,28 @@ class OllamaClient:
                         logger.warning("API响应中未找到预期的回复内容")
                         return ""
                     
-            except aiohttp.ClientError as e:
-                logger.warning(f"异步API调用失败(尝试 {attempt+1}/{retry_count}): {e}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # 超时的请求可能仍在服务端排队或生成，重发只会成倍增加推理负载，因此超时不重试；
+                # asyncio.TimeoutError的消息为空，改用异常类型名
+                reason = str(e) or type(e).__name__
+                logger.warning(f"异步API调用失败(尝试 {attempt+1}/{retry_count}): {reason}")
                 
-                if attempt < retry_count - 1:
+                if attempt < retry_count - 1 and not isinstance(e, asyncio.TimeoutError):
                     delay = retry_delay * (2 ** attempt)  # 指数退避策略
+                    # 服务端过载（429/503）时按Retry-After给出的时间等待
+                    if isinstance(e, aiohttp.ClientResponseError) and e.status in (429, 503):
+                        delay = max(delay, _parse_retry_after(e.headers, self.max_retry_delay))
                     logger.info(f"等待 {delay:.2f} 秒后重试...")
                     await asyncio.sleep(delay)
                 else:
-                    error_msg = f"异步API调用错误(重试 {retry_count} 次后): {e}"
+                    error_msg = f"异步API调用错误(尝试 {attempt+1} 次后): {reason}"
                     logger.error(error_msg)
+                    overloaded = _is_overload_error(e)
                     
                     if return_full_response:
-                        return {"error": str(e)}
+                        return {"error": reason, "overloaded": overloaded}
                         
-                    raise OllamaException(error_msg) from e
+                    raise OllamaException(error_msg, overloaded=overloaded) from e
     
     async def generate_stream(self, 
                            model: str, 
@@ -318,46 +458,17 @@ class OllamaClient:
         Yields:
             生成的文本片段
         """
-        # 构建消息列表
-        messages = []
-        
-        # 添加系统提示词
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
-        
-        # 添加用户提示词
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
-        
-        # 构建请求负载
-        payload = {
-            "model": model,
-            "messages": messages,
-            "stream": True,
-            "keep_alive": keep_alive
-        }
-
-        # 添加温度参数
-        if options is None:
-            options = {}
-        options["temperature"] = temperature
-        options["top_p"] = top_p
-            
-        # 如果有其他选项，添加到payload
-        if options:
-            payload["options"] = options
+        # 构建请求体，系统提示词和模型参数部分来自缓存的模板
+        data = self._encode_payload(
+            model, prompt, system_prompt, True, keep_alive, temperature, top_p, options
+        )
         
         logger.debug(f"流式调用Ollama API，模型: {model}, 温度: {temperature}, top_p: {top_p}")
         
         session = await self.get_session()
         
         try:
-            async with session.post(self.api_endpoint, json=payload) as response:
+            async with session.post(self.api_endpoint, data=data, headers=_JSON_HEADERS) as response:
                 response.raise_for_status()
                 
                 async for line in response.content:
@@ -366,12 +477,12 @@ class OllamaClient:
                         continue
                         
                     try:
-                        data = json.loads(line)
-                        if "message" in data and "content" in data["message"]:
-                            content = data["message"]["content"]
+                        chunk = loads(line)
+                        if "message" in chunk and "content" in chunk["message"]:
+                            content = chunk["message"]["content"]
                             yield content
                             
-                        if data.get("done", False):
+                        if chunk.get("done", False):
                             break
                     except json.JSONDecodeError:
                         logger.warning(f"无法解析流式响应数据: {line}")
@@ -436,7 +547,7 @@ class OllamaClient:
                 "options": {"num_predict": 1}  # 只预测一个token来快速检查
             }
             
-            response = requests.post(self.api_endpoint, json=test_payload, timeout=self.timeout)
+            response = self.http_session.post(self.api_endpoint, json=test_payload, timeout=self.timeout)
             
             if response.status_code == 200:
                 return True, ""
@@ -444,7 +555,7 @@ class OllamaClient:
                 error_msg = f"模型不可用: HTTP {response.status_code}"
                 if response.text:
                     try:
-                        error_json = response.json()
+                        error_json = loads(response.content)
                         if "error" in error_json:
                             error_msg = f"模型错误: {error_json['error']}"
                     except json.JSONDecodeError:
@@ -466,16 +577,16 @@ class OllamaClient:
         """
         try:
             url = f"{self.base_url}/api/tags"
-            response = requests.get(url, timeout=self.timeout)
+            response = self.http_session.get(url, timeout=self.timeout)
             response.raise_for_status()
-            result = response.json()
+            result = loads(response.content)
             
             if "models" in result:
                 return result["models"]
             else:
                 return []
                 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
             error_msg = f"获取模型列表错误: {e}"
             logger.error(error_msg)
             raise OllamaException(error_msg) from e 
\ No newline at end of file
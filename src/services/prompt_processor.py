@@ -5,18 +5,42 @@
 """
 import os
 import time
-import json
 import logging
-from typing import List, Dict, Any, Optional
+import asyncio
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO
 
-from ..ollama_client import OllamaClient
+from ..ollama_client import OllamaClient, OllamaException
 from ..config.settings import settings
-from ..utils.file_utils import get_existing_responses, compute_prompt_hash, save_json_file, extract_json_from_text
+from ..utils.file_utils import (
+    get_existing_responses, compute_prompt_hash, compute_legacy_prompt_hash,
+    save_json_file, write_bytes_file, extract_json_from_text
+)
+from ..utils.json_utils import dumps, dumps_bytes, loads
 from ..utils.evaluation_utils import evaluate_model_predictions
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 自适应请求间隔的参数：失败后的最小间隔、最大间隔，以及减半间隔所需的连续成功次数
+_ADAPTIVE_MIN_INTERVAL = 0.1
+_ADAPTIVE_MAX_INTERVAL = 30.0
+_ADAPTIVE_SUCCESS_STREAK = 8
+
+
+def _read_response_file(file_path: str) -> str:
+    """读取已保存的响应文件
+    
+    Args:
+        file_path: 响应文件路径
+        
+    Returns:
+        响应内容
+    """
+    # 以二进制读取后一次性解码，跳过文本层的换行符转换
+    with open(file_path, "rb") as f:
+        return f.read().decode("utf-8")
+
 
 class PromptProcessorService:
     """提示词处理服务类"""
@@ -27,9 +51,16 @@ class PromptProcessorService:
         Args:
             client: 可选的Ollama客户端实例，如果未提供则创建新实例
         """
-        self.client = client or OllamaClient(settings.api_url)
+        self.client = client or OllamaClient(
+            settings.api_url, timeout=settings.timeout, max_retry_delay=settings.max_retry_delay
+        )
         self.summary = []
         self.processed_ids = set()
+        self._next_request_time = 0.0
+        self._request_interval = settings.delay
+        self._success_streak = 0
+        self._model_options: Optional[Dict[str, Any]] = None
+        self._write_response_files = True
         
     def process_prompts(
         self, 
@@ -38,7 +69,36 @@ class PromptProcessorService:
         prompts: List[str], 
         output_dir: Optional[str] = None
     ) -> Dict[str, Any]:
-        """处理提示词列表
+        """处理提示词列表，在新的事件循环中运行process_prompts_async
+        
+        Args:
+            model_name: 要使用的模型名称
+            system_prompt: 系统提示词
+            prompts: 提示词列表
+            output_dir: 可选的输出目录，如果不提供则使用配置中的默认值
+            
+        Returns:
+            包含处理结果的摘要信息
+            
+        Raises:
+            RuntimeError: 在已运行的事件循环中调用时抛出（如Jupyter），此时应使用process_prompts_async
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.process_prompts_async(model_name, system_prompt, prompts, output_dir))
+        raise RuntimeError(
+            "process_prompts不能在运行中的事件循环里调用，请改用 await process_prompts_async(...)"
+        )
+    
+    async def process_prompts_async(
+        self, 
+        model_name: str, 
+        system_prompt: str, 
+        prompts: List[str], 
+        output_dir: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """异步处理提示词列表，可在已有的事件循环中直接await
         
         Args:
             model_name: 要使用的模型名称
@@ -60,17 +120,12 @@ class PromptProcessorService:
         if settings.save_raw_response:
             os.makedirs(settings.raw_output_dir, exist_ok=True)
         
-        # 获取已存在的响应
-        existing_responses = {}
-        if settings.resume_from_checkpoint:
-            existing_responses = get_existing_responses(settings.output_dir)
-        
         # 加载已有的摘要（如果存在）
         summary_file = os.path.join(settings.output_dir, "summary.json")
         if settings.resume_from_checkpoint and os.path.exists(summary_file):
             try:
-                with open(summary_file, "r", encoding="utf-8") as f:
-                    self.summary = json.load(f)
+                with open(summary_file, "rb") as f:
+                    self.summary = loads(f.read())
                 logger.info(f"已加载现有摘要，包含 {len(self.summary)} 个条目")
                 
                 # 记录已处理的提示词ID
@@ -78,139 +133,61 @@ class PromptProcessorService:
             except Exception as e:
                 logger.error(f"加载摘要文件时出错: {e}")
         
-        # 处理每个提示词
-        for i, prompt in enumerate(prompts):
-            prompt_id = i + 1
-            
-            # 如果已经处理过，则跳过
-            if settings.resume_from_checkpoint and prompt_id in self.processed_ids:
-                logger.info(f"跳过已处理的提示词 {prompt_id}/{len(prompts)}: {prompt[:50]}...")
-                continue
-            
-            logger.info(f"处理提示词 {prompt_id}/{len(prompts)}: {prompt[:50]}...")
-            
-            # 创建提示词哈希
-            prompt_hash = compute_prompt_hash(prompt)
-            
-            # 检查是否已经处理过这个提示词
-            if settings.resume_from_checkpoint and prompt_hash in existing_responses:
-                logger.info(f"已存在响应文件: {existing_responses[prompt_hash]}")
-                
-                # 尝试读取现有响应
-                try:
-                    with open(existing_responses[prompt_hash], "r", encoding="utf-8") as f:
-                        response = f.read()
-                    
-                    # 添加到摘要
-                    self.summary.append({
-                        "prompt_id": prompt_id,
-                        "prompt": prompt,
-                        "response": response,
-                        "output_file": existing_responses[prompt_hash]
-                    })
-                    self.processed_ids.add(prompt_id)
-                    
-                    # 保存摘要
-                    if settings.save_summary:
-                        self._save_summary(summary_file)
-                        
-                    continue
-                except Exception as e:
-                    logger.error(f"读取现有响应时出错: {e}")
-            
-            # 调用模型获取响应
-            try:
-                if settings.save_raw_response:
-                    full_response = self.client.generate(
-                        model_name, 
-                        prompt, 
-                        system_prompt, 
-                        return_full_response=True, 
-                        temperature=settings.temperature,
-                        top_p=settings.top_p,
-                        precision_bias=settings.precision_bias
-                    )
-                    response = full_response.get("message", {}).get("content", "")
-                    
-                    # 保存原始响应
-                    raw_output_file = os.path.join(
-                        settings.raw_output_dir, 
-                        f"raw_response_{prompt_id}_{prompt_hash}.json"
-                    )
-                    save_json_file(raw_output_file, full_response)
-                else:
-                    response = self.client.generate(
-                        model_name, 
-                        prompt, 
-                        system_prompt, 
-                        temperature=settings.temperature,
-                        top_p=settings.top_p,
-                        precision_bias=settings.precision_bias
-                    )
-                
-                # 处理响应内容，确保是JSON格式
-                json_response = extract_json_from_text(response)
-                
-                if json_response:
-                    formatted_response = json.dumps(json_response, ensure_ascii=False, indent=2)
-                    logger.info("响应内容为有效的JSON格式")
-                else:
-                    logger.error(f"错误: 响应内容不是有效的JSON格式")
-                    formatted_response = response  # 使用原始响应，后续可能需要人工检查
-                
-                # 创建输出文件名
-                output_file = os.path.join(settings.output_dir, f"response_{prompt_id}_{prompt_hash}.json")
-                
-                # 保存格式化后的响应到文件
-                with open(output_file, "w", encoding="utf-8") as f:
-                    if json_response:
-                        f.write(formatted_response)
-                    else:
-                        # 当不是有效JSON时，保存原始响应
-                        f.write(response)
-                    
-                logger.info(f"已保存响应到: {output_file}")
-                
-                # 添加到摘要
-                self.summary.append({
-                    "prompt_id": prompt_id,
-                    "prompt": prompt,
-                    "response": formatted_response if json_response else response,
-                    "output_file": output_file
-                })
-                self.processed_ids.add(prompt_id)
-                
-                # 保存摘要
-                if settings.save_summary:
-                    self._save_summary(summary_file)
-                
-                # 添加短暂延迟以避免API限制
-                if i < len(prompts) - 1:  # 最后一个提示词后不需要延迟
-                    time.sleep(settings.delay)
-                    
-            except Exception as e:
-                logger.error(f"处理提示词时出错: {prompt_id}, 错误: {e}")
-                continue
-        
-        # 计算评估指标
-        metrics = {
-            "metrics": {
-                "accuracy": 0.0,
-                "precision": 0.0,
-                "recall": 0.0,
-                "f1": 0.0
-            },
-            "confusion_matrix": {
-                "TP": 0,
-                "FP": 0,
-                "TN": 0,
-                "FN": 0
-            },
-            "valid_samples": 0,
-            "total_samples": len(self.summary),
-            "samples": []
-        }
-        if settings.dataset_file:
+        # 增量检查点：每处理完一个提示词追加一行，避免每次重写整个summary.json
+        checkpoint_file = os.path.join(settings.output_dir, "summary.jsonl")
+        if settings.resume_from_checkpoint and os.path.exists(checkpoint_file):
+            self._load_checkpoint(checkpoint_file)
+        
+        # 已处理过的提示词直接跳过，不再为其计算哈希或创建任务
+        pending = [
+            (i + 1, prompt) for i, prompt in enumerate(prompts)
+            if not (settings.resume_from_checkpoint and i + 1 in self.processed_ids)
+        ]
+        if len(pending) < len(prompts):
+            logger.info(f"跳过 {len(prompts) - len(pending)} 个已处理的提示词")
+        
+        # 汇总模式下响应只保存在摘要中，依赖摘要做断点续传，因此不能同时关闭摘要
+        if settings.aggregate_responses and not settings.save_summary:
+            logger.warning("汇总模式需要保存摘要，仍为每个提示词单独保存响应文件")
+        self._write_response_files = not (settings.aggregate_responses and settings.save_summary)
+        
+        # 获取已存在的响应，全部提示词都已处理或汇总模式不写响应文件时无需扫描输出目录
+        existing_responses = {}
+        if settings.resume_from_checkpoint and pending and self._write_response_files:
+            existing_responses = get_existing_responses(settings.output_dir)
+        
+        # 在事件循环中并发处理每个提示词，请求耗时主要在网络和模型推理上
+        workers = settings.workers if settings.workers > 0 else (min(8, len(prompts)) or 1)
+        logger.info(f"最多同时处理 {workers} 个提示词，共 {len(prompts)} 个")
+        
+        # 额外模型参数在整个运行期间不变，只构建一次；系统提示词和参数保持逐字节一致，
+        # Ollama即可在请求之间复用系统提示词部分的KV缓存
+        model_options = dict(settings.model_options)
+        if settings.num_keep > 0:
+            model_options["num_keep"] = settings.num_keep
+        self._model_options = model_options or None
+        
+        # 自适应模式下请求间隔从0开始，由请求结果动态调整
+        self._request_interval = 0.0 if settings.adaptive_delay else settings.delay
+        self._success_streak = 0
+        
+        checkpoint = None
+        if settings.save_summary:
+            checkpoint = open(checkpoint_file, "ab" if settings.resume_from_checkpoint else "wb")
+        try:
+            await self._process_all(
+                model_name, system_prompt, pending, len(prompts), workers, existing_responses, checkpoint
+            )
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+        
+        # 按提示词ID恢复摘要顺序，完成顺序与提交顺序不一定一致
+        self.summary.sort(key=itemgetter("prompt_id"))
+        
+        # 计算评估指标，没有可用的数据集文件时跳过评估，报告中也不生成指标部分
+        metrics: Dict[str, Any] = {}
+        if settings.dataset_file and os.path.isfile(settings.dataset_file):
             try:
                 logger.info(f"开始计算评估指标，使用数据集文件: {settings.dataset_file}")
                 logger.info(f"当前摘要包含 {len(self.summary)} 个样本")
@@ -219,9 +196,13 @@ class PromptProcessorService:
                 logger.error(f"计算评估指标时出错: {e}")
                 logger.error(f"错误详情: {str(e)}")
         
-        # 最终保存摘要
-        if settings.save_summary and self.summary:
-            self._save_summary(summary_file)
+        # 最终保存摘要，summary.json写入成功后增量检查点已不再需要；
+        # 没有任何条目（例如全部提示词都失败）时检查点为空，同样删除
+        if settings.save_summary and (not self.summary or self._save_summary(summary_file)):
+            try:
+                os.remove(checkpoint_file)
+            except OSError as e:
+                logger.warning(f"删除增量检查点文件时出错: {e}")
         
         # 返回处理结果
         return {
@@ -233,18 +214,292 @@ class PromptProcessorService:
             "metrics": metrics
         }
     
-    def _save_summary(self, summary_file: str) -> None:
+    async def _process_all(
+        self,
+        model_name: str,
+        system_prompt: str,
+        pending: List[Tuple[int, str]],
+        total: int,
+        workers: int,
+        existing_responses: Dict[str, str],
+        checkpoint: Optional[BinaryIO]
+    ) -> None:
+        """并发处理所有提示词，同时进行中的请求数不超过workers
+        
+        Args:
+            model_name: 要使用的模型名称
+            system_prompt: 系统提示词
+            pending: 待处理的(提示词ID, 提示词)列表
+            total: 提示词总数
+            workers: 最大并发请求数
+            existing_responses: 已存在的响应文件，键为提示词哈希
+            checkpoint: 以追加模式打开的增量检查点文件，为None时不写检查点
+        """
+        semaphore = asyncio.Semaphore(workers)
+        
+        # 内容相同的提示词只请求一次模型，其余提示词ID直接复用第一次的结果
+        prompt_groups: Dict[str, List[int]] = {}
+        for prompt_id, prompt in pending:
+            prompt_groups.setdefault(prompt, []).append(prompt_id)
+        if len(prompt_groups) < len(pending):
+            logger.info(f"发现 {len(pending) - len(prompt_groups)} 个重复的提示词，将复用相同提示词的响应")
+        
+        async def run_one(prompt: str, prompt_ids: List[int]) -> None:
+            async with semaphore:
+                item = await self._process_one(
+                    prompt_ids[0], prompt, total, model_name, system_prompt,
+                    existing_responses, checkpoint
+                )
+            if item is None:
+                return
+            # 重复提示词的哈希相同，响应文件也共用同一个，续跑时同样能按哈希找到
+            for duplicate_id in prompt_ids[1:]:
+                duplicate_item = dict(item)
+                duplicate_item["prompt_id"] = duplicate_id
+                self._add_summary_item(duplicate_item, checkpoint)
+        
+        try:
+            await asyncio.gather(*(run_one(prompt, prompt_ids) for prompt, prompt_ids in prompt_groups.items()))
+        finally:
+            # 会话绑定在当前事件循环上，退出前关闭
+            await self.client.close_session()
+    
+    async def _wait_for_rate_limit(self) -> None:
+        """等待直到可以发起下一个请求，保证相邻请求的发起间隔不小于当前请求间隔"""
+        now = time.monotonic()
+        wait = self._next_request_time - now
+        self._next_request_time = max(now, self._next_request_time) + self._request_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    def _record_request_result(self, success: bool) -> None:
+        """根据请求结果调整自适应请求间隔：过载失败时加倍，连续成功时减半
+        
+        Args:
+            success: 请求是否成功，False表示服务端过载（429/5xx或超时）
+        """
+        if not settings.adaptive_delay:
+            return
+        if success:
+            self._success_streak += 1
+            if self._success_streak >= _ADAPTIVE_SUCCESS_STREAK and self._request_interval > 0:
+                self._success_streak = 0
+                self._request_interval /= 2
+                if self._request_interval < _ADAPTIVE_MIN_INTERVAL:
+                    self._request_interval = 0.0
+                logger.debug(f"请求连续成功，请求间隔降为 {self._request_interval:.2f} 秒")
+        else:
+            self._success_streak = 0
+            self._request_interval = min(
+                max(self._request_interval * 2, _ADAPTIVE_MIN_INTERVAL), _ADAPTIVE_MAX_INTERVAL
+            )
+            logger.info(f"请求失败，请求间隔增加到 {self._request_interval:.2f} 秒")
+    
+    async def _process_one(
+        self,
+        prompt_id: int,
+        prompt: str,
+        total: int,
+        model_name: str,
+        system_prompt: str,
+        existing_responses: Dict[str, str],
+        checkpoint: Optional[BinaryIO]
+    ) -> Optional[Dict[str, Any]]:
+        """处理单个尚未处理的提示词，结果追加到摘要中
+        
+        Args:
+            prompt_id: 提示词ID（从1开始）
+            prompt: 提示词内容
+            total: 提示词总数
+            model_name: 要使用的模型名称
+            system_prompt: 系统提示词
+            existing_responses: 已存在的响应文件，键为提示词哈希
+            checkpoint: 以追加模式打开的增量检查点文件，为None时不写检查点
+            
+        Returns:
+            添加到摘要中的条目，处理失败时返回None
+        """
+        logger.info(f"处理提示词 {prompt_id}/{total}: {prompt[:50]}...")
+        # 文件读写放到线程池中执行，避免磁盘I/O阻塞其他提示词的模型请求
+        loop = asyncio.get_running_loop()
+        
+        # 创建提示词哈希
+        prompt_hash = compute_prompt_hash(prompt)
+        
+        # 检查是否已经处理过这个提示词，兼容旧版本以MD5哈希命名的响应文件
+        existing_file = None
+        if settings.resume_from_checkpoint and existing_responses:
+            existing_file = (
+                existing_responses.get(prompt_hash)
+                or existing_responses.get(compute_legacy_prompt_hash(prompt))
+            )
+        if existing_file:
+            logger.info(f"已存在响应文件: {existing_file}")
+            
+            # 尝试读取现有响应
+            try:
+                # 在线程池中读取文件，读取期间事件循环继续处理其他提示词的模型请求
+                response = await loop.run_in_executor(None, _read_response_file, existing_file)
+                
+                # 添加到摘要
+                item = {
+                    "prompt_id": prompt_id,
+                    "prompt": prompt,
+                    "prompt_hash": prompt_hash,
+                    "response": response,
+                    "output_file": existing_file
+                }
+                self._add_summary_item(item, checkpoint)
+                return item
+            except Exception as e:
+                logger.error(f"读取现有响应时出错: {e}")
+        
+        # 调用模型获取响应
+        try:
+            # 限制请求速率以避免API限制
+            await self._wait_for_rate_limit()
+            
+            if settings.save_raw_response:
+                full_response = await self.client.generate_async(
+                    model_name, 
+                    prompt, 
+                    system_prompt, 
+                    return_full_response=True, 
+                    temperature=settings.temperature,
+                    top_p=settings.top_p,
+                    precision_bias=settings.precision_bias,
+                    options=self._model_options,
+                    keep_alive=settings.keep_alive,
+                    timeout=settings.timeout
+                )
+                if "error" not in full_response:
+                    self._record_request_result(True)
+                elif full_response.get("overloaded"):
+                    self._record_request_result(False)
+                response = full_response.get("message", {}).get("content", "")
+                
+                # 保存原始响应
+                raw_output_file = os.path.join(
+                    settings.raw_output_dir, 
+                    f"raw_response_{prompt_id}_{prompt_hash}.json"
+                )
+                await loop.run_in_executor(
+                    None, save_json_file, raw_output_file, full_response,
+                    False, 2 if settings.pretty_responses else None
+                )
+            else:
+                response = await self.client.generate_async(
+                    model_name, 
+                    prompt, 
+                    system_prompt, 
+                    temperature=settings.temperature,
+                    top_p=settings.top_p,
+                    precision_bias=settings.precision_bias,
+                    options=self._model_options,
+                    keep_alive=settings.keep_alive,
+                    timeout=settings.timeout
+                )
+                self._record_request_result(True)
+            
+            # 处理响应内容，确保是JSON格式
+            json_response = extract_json_from_text(response)
+            
+            if json_response:
+                formatted_response = dumps(json_response, indent=settings.pretty_responses)
+                logger.info("响应内容为有效的JSON格式")
+            else:
+                logger.error(f"错误: 响应内容不是有效的JSON格式")
+                formatted_response = response  # 使用原始响应，后续可能需要人工检查
+            
+            # 保存格式化后的响应到文件（不是有效JSON时formatted_response即原始响应），
+            # 汇总模式下响应只写入摘要。续跑时以文件是否存在判断已完成，因此原子写入
+            output_file = ""
+            if self._write_response_files:
+                output_file = os.path.join(settings.output_dir, f"response_{prompt_id}_{prompt_hash}.json")
+                await loop.run_in_executor(
+                    None, write_bytes_file, output_file, formatted_response.encode("utf-8"), True
+                )
+                logger.info(f"已保存响应到: {output_file}")
+            
+            # 添加到摘要
+            item = {
+                "prompt_id": prompt_id,
+                "prompt": prompt,
+                "prompt_hash": prompt_hash,
+                "response": formatted_response if json_response else response,
+                "output_file": output_file
+            }
+            self._add_summary_item(item, checkpoint)
+            return item
+                
+        except Exception as e:
+            # 只有服务端过载（429/5xx或超时）才增大请求间隔，请求本身有误时降速无济于事
+            if isinstance(e, OllamaException) and e.overloaded:
+                self._record_request_result(False)
+            logger.error(f"处理提示词时出错: {prompt_id}, 错误: {e}")
+            return None
+    
+    def _add_summary_item(self, item: Dict[str, Any], checkpoint: Optional[BinaryIO]) -> None:
+        """添加摘要条目并追加到增量检查点
+        
+        Args:
+            item: 摘要条目
+            checkpoint: 以追加模式打开的增量检查点文件，为None时不写检查点
+        """
+        self.summary.append(item)
+        self.processed_ids.add(item["prompt_id"])
+        
+        # 追加一行检查点，立即刷新以便中断后可以恢复
+        if checkpoint is not None:
+            try:
+                checkpoint.write(dumps_bytes(item) + b"\n")
+                checkpoint.flush()
+            except Exception as e:
+                logger.error(f"写入增量检查点时出错: {e}")
+    
+    def _load_checkpoint(self, checkpoint_file: str) -> None:
+        """从增量检查点恢复summary.json中尚未包含的条目
+        
+        Args:
+            checkpoint_file: 增量检查点文件路径
+        """
+        restored = 0
+        try:
+            with open(checkpoint_file, "rb") as f:
+                for line in f:
+                    try:
+                        item = loads(line)
+                    except ValueError:
+                        # 中断时可能留下不完整的最后一行
+                        continue
+                    # 截断后仍可能是合法JSON（如数字），跳过不是摘要条目的行
+                    if not isinstance(item, dict) or "prompt_id" not in item:
+                        continue
+                    if item["prompt_id"] not in self.processed_ids:
+                        self.summary.append(item)
+                        self.processed_ids.add(item["prompt_id"])
+                        restored += 1
+        except Exception as e:
+            logger.error(f"加载增量检查点时出错: {e}")
+        logger.info(f"已从增量检查点恢复 {restored} 个条目")
+    
+    def _save_summary(self, summary_file: str) -> bool:
         """保存摘要到文件
         
         Args:
             summary_file: 摘要文件路径
+            
+        Returns:
+            是否保存成功
         """
         try:
-            with open(summary_file, "w", encoding="utf-8") as f:
-                json.dump(self.summary, f, ensure_ascii=False, indent=2)
+            # 原子替换，中途失败不会留下半截的summary.json
+            write_bytes_file(summary_file, dumps_bytes(self.summary, indent=settings.pretty_summary), atomic=True)
             logger.debug(f"已保存摘要到: {summary_file}")
+            return True
         except Exception as e:
             logger.error(f"保存摘要文件时出错: {e}")
+            return False
             
     def get_summary(self) -> List[Dict[str, Any]]:
         """获取处理摘要
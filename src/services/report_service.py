@@ -4,16 +4,14 @@
 报告服务模块，提供报告生成功能。
 """
 import os
-import json
-import datetime
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 # 导入评估工具
 from ..utils.evaluation_utils import evaluate_model_predictions
 
 from src.config.settings import settings
-from src.templates.report_template import generate_html_report
+from src.templates.report_template import generate_html_report, parse_responses
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -31,7 +29,8 @@ class ReportService:
         summary: List[Dict[str, Any]], 
         system_prompt: str,
         metrics: Optional[Dict[str, Any]] = None,
-        dataset_file: Optional[str] = None
+        dataset_file: Optional[str] = None,
+        compress: bool = False
     ) -> Optional[str]:
         """生成HTML报告
         
@@ -40,6 +39,7 @@ class ReportService:
             system_prompt: 系统提示词
             metrics: 评估指标（可选）
             dataset_file: 数据集文件路径（可选）
+            compress: 是否输出gzip压缩的报告（可选）
             
         Returns:
             生成的HTML文件路径，如果失败则返回None
@@ -58,40 +58,36 @@ class ReportService:
             except Exception as e:
                 logger.error(f"计算评估指标时出错: {e}")
         
+        # 每个响应只解析一次，成功率统计和报告渲染共用解析结果
+        parsed_responses = parse_responses(summary)
+        logger.info(f"有效JSON响应比例: {self._calculate_success_rate(parsed_responses)}%")
+        
         # 使用模板生成HTML报告
         return generate_html_report(
             summary=summary,
             output_dir=self.output_dir,
             model_name=settings.model_name,
             system_prompt=system_prompt,
-            metrics=metrics
+            metrics=metrics,
+            parsed_responses=parsed_responses,
+            compress=compress
         )
 
     @staticmethod
-    def _calculate_success_rate(summary: List[Dict[str, Any]]) -> float:
+    def _calculate_success_rate(parsed_responses: List[Tuple[Any, bool]]) -> float:
         """计算成功率
         
         Args:
-            summary: 摘要数据
+            parsed_responses: parse_responses返回的解析结果
             
         Returns:
             成功率（百分比）
         """
-        if not summary:
+        if not parsed_responses:
             return 0.0
             
-        # 检查哪些响应是有效的JSON
-        valid_json_count = 0
-        for item in summary:
-            response = item.get("response", "")
-            try:
-                if isinstance(response, str):
-                    json.loads(response)
-                    valid_json_count += 1
-                elif isinstance(response, (dict, list)):  # 如果已经是Python对象，也视为有效JSON
-                    valid_json_count += 1
-            except:
-                continue
+        # 统计有效JSON响应的数量
+        valid_json_count = sum(1 for _, is_valid in parsed_responses if is_valid)
                 
         # 计算成功率百分比
-        return round((valid_json_count / len(summary)) * 100, 2) 
\ No newline at end of file
+        return round((valid_json_count / len(parsed_responses)) * 100, 2)
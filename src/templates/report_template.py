@@ -2,44 +2,100 @@
 报告模板模块，提供HTML报告生成功能。
 """
 import os
-import json
-import datetime
-from typing import List, Optional, Dict, Any
+import gzip
+import string
+import time
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 
+from src.utils.json_utils import dumps, dumps_bytes, loads, quick_json_reject
 
-def generate_html_report_content(
-    summary: list, 
-    model_name: str, 
-    system_prompt: str,
-    metrics: Optional[Dict[str, Any]] = None
-) -> str:
-    """生成HTML报告内容
-    
-    Args:
-        summary: 摘要数据
-        model_name: 模型名称
-        system_prompt: 系统提示词
-        metrics: 评估指标（可选）
+
+# 侧边栏中的评估指标导航项
+_METRICS_NAV_HTML = '<div class="nav-item" onclick="scrollToSection(\'metrics\')">评估指标</div>'
+
+# 样本筛选区域
+_FILTER_SECTION_HTML = """
+        <div class="filter-container">
+            <div class="filter-buttons">
+                <button class="filter-btn all active" onclick="filterSamples('all')">全部</button>
+                <button class="filter-btn tp" onclick="filterSamples('TP')">真正例 (TP)</button>
+                <button class="filter-btn fp" onclick="filterSamples('FP')">假正例 (FP)</button>
+                <button class="filter-btn tn" onclick="filterSamples('TN')">真负例 (TN)</button>
+                <button class="filter-btn fn" onclick="filterSamples('FN')">假负例 (FN)</button>
+            </div>
+            <div class="sample-count">显示 <span id="sample-count">0</span> 个样本</div>
+        </div>
+        """
+
+# 评估指标区域模板
+_METRICS_SECTION_TMPL = """
+    <div id="metrics">
+        <h2>评估指标</h2>
+        <div class="metrics-container">
+            <div class="metric-card">
+                <div class="metric-value">%(accuracy).2f%%</div>
+                <div class="metric-label">准确率 (Accuracy)</div>
+            </div>
+            <div class="metric-card">
+                <div class="metric-value">%(precision).2f%%</div>
+                <div class="metric-label">精确率 (Precision)</div>
+            </div>
+            <div class="metric-card">
+                <div class="metric-value">%(recall).2f%%</div>
+                <div class="metric-label">召回率 (Recall)</div>
+            </div>
+            <div class="metric-card">
+                <div class="metric-value">%(f1).2f%%</div>
+                <div class="metric-label">F1分数</div>
+            </div>
+        </div>
         
-    Returns:
-        HTML内容字符串
+        <div class="metrics-detail">
+            <h3>详细评估指标</h3>
+            <div class="metrics-grid">
+                <div class="metric-detail-item">
+                    <div class="metric-detail-label">真正例 (True Positive)</div>
+                    <div class="metric-detail-value">%(tp)s</div>
+                    <div class="metric-detail-description">正确识别为指令的样本数</div>
+                </div>
+                <div class="metric-detail-item">
+                    <div class="metric-detail-label">假正例 (False Positive)</div>
+                    <div class="metric-detail-value">%(fp)s</div>
+                    <div class="metric-detail-description">错误识别为指令的样本数</div>
+                </div>
+                <div class="metric-detail-item">
+                    <div class="metric-detail-label">真负例 (True Negative)</div>
+                    <div class="metric-detail-value">%(tn)s</div>
+                    <div class="metric-detail-description">正确识别为非指令的样本数</div>
+                </div>
+                <div class="metric-detail-item">
+                    <div class="metric-detail-label">假负例 (False Negative)</div>
+                    <div class="metric-detail-value">%(fn)s</div>
+                    <div class="metric-detail-description">错误识别为非指令的样本数</div>
+                </div>
+            </div>
+        </div>
+        
+        <div class="chart-container">
+            <h3>混淆矩阵</h3>
+            <div class="confusion-matrix">
+                <div class="matrix-cell matrix-header">预测值</div>
+                <div class="matrix-cell matrix-header">真实值</div>
+                <div class="matrix-cell matrix-tp">TP: %(tp)s</div>
+                <div class="matrix-cell matrix-fp">FP: %(fp)s</div>
+                <div class="matrix-cell matrix-tn">TN: %(tn)s</div>
+                <div class="matrix-cell matrix-fn">FN: %(fn)s</div>
+            </div>
+        </div>
+    </div>
     """
-    if not summary:
-        return ""
-    
-    # 获取当前时间
-    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # 构建HTML内容
-    html_content = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>对话意图识别结果报告</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        body {{
+
+# HTML转义表，str.translate一次遍历即可完成全部替换
+_HTML_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+# 报告样式表，作为独立常量整体代入头部模板
+_STYLE_BLOCK = """    <style>
+        body {
             font-family: Arial, sans-serif;
             line-height: 1.6;
             margin: 0;
@@ -47,25 +103,25 @@ def generate_html_report_content(
             color: #333;
             max-width: 1200px;
             margin: 0 auto;
-        }}
-        h1, h2, h3 {{
+        }
+        h1, h2, h3 {
             color: #2c3e50;
-        }}
-        .header {{
+        }
+        .header {
             background-color: #f8f9fa;
             padding: 20px;
             border-radius: 5px;
             margin-bottom: 20px;
             border-left: 5px solid #007bff;
-        }}
-        .system-prompt-container {{
+        }
+        .system-prompt-container {
             background-color: #fff;
             padding: 15px;
             border-radius: 5px;
             margin-bottom: 20px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }}
-        .system-prompt-header {{
+        }
+        .system-prompt-header {
             display: flex;
             justify-content: space-between;
             align-items: center;
@@ -75,104 +131,104 @@ def generate_html_report_content(
             border-radius: 5px;
             margin-bottom: 10px;
             transition: background-color 0.2s;
-        }}
-        .system-prompt-header:hover {{
+        }
+        .system-prompt-header:hover {
             background-color: #e9ecef;
-        }}
-        .system-prompt-content {{
+        }
+        .system-prompt-content {
             background-color: #f0f7ff;
             padding: 15px;
             border-radius: 5px;
             white-space: pre-wrap;
             border: 1px solid #cce5ff;
             display: none;
-        }}
-        .system-prompt-content.expanded {{
+        }
+        .system-prompt-content.expanded {
             display: block;
-        }}
-        .toggle-icon {{
+        }
+        .toggle-icon {
             font-size: 1.2em;
             color: #6c757d;
             transition: transform 0.2s;
-        }}
-        .toggle-icon.expanded {{
+        }
+        .toggle-icon.expanded {
             transform: rotate(180deg);
-        }}
-        .metrics-container {{
+        }
+        .metrics-container {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 20px;
             margin-bottom: 30px;
-        }}
-        .metric-card {{
+        }
+        .metric-card {
             background-color: #fff;
             padding: 15px;
             border-radius: 5px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
             text-align: center;
             transition: transform 0.2s;
-        }}
-        .metric-card:hover {{
+        }
+        .metric-card:hover {
             transform: translateY(-5px);
-        }}
-        .metric-value {{
+        }
+        .metric-value {
             font-size: 24px;
             font-weight: bold;
             color: #007bff;
-        }}
-        .metric-label {{
+        }
+        .metric-label {
             color: #6c757d;
             margin-top: 5px;
-        }}
-        .chart-container {{
+        }
+        .chart-container {
             background-color: #fff;
             padding: 20px;
             border-radius: 5px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
             margin-bottom: 30px;
-        }}
-        .result-item {{
+        }
+        .result-item {
             background-color: #fff;
             padding: 15px;
             border-radius: 5px;
             margin-bottom: 15px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
             transition: transform 0.2s;
-        }}
-        .result-item:hover {{
+        }
+        .result-item:hover {
             transform: translateX(5px);
-        }}
-        .prompt {{
+        }
+        .prompt {
             background-color: #f8f9fa;
             padding: 10px;
             border-radius: 5px;
             margin-bottom: 10px;
             white-space: pre-wrap;
             border-left: 3px solid #6c757d;
-        }}
-        .response {{
+        }
+        .response {
             background-color: #f0fff0;
             padding: 10px;
             border-radius: 5px;
             white-space: pre-wrap;
             border-left: 3px solid #28a745;
-        }}
-        .json {{
+        }
+        .json {
             font-family: monospace;
-        }}
-        .meta {{
+        }
+        .meta {
             color: #6c757d;
             font-size: 0.9em;
             margin-top: 10px;
-        }}
-        .footer {{
+        }
+        .footer {
             margin-top: 30px;
             padding-top: 10px;
             border-top: 1px solid #eee;
             color: #6c757d;
             font-size: 0.9em;
-        }}
-        .toggle-btn {{
+        }
+        .toggle-btn {
             background-color: #007bff;
             color: white;
             border: none;
@@ -181,43 +237,47 @@ def generate_html_report_content(
             cursor: pointer;
             margin-bottom: 10px;
             transition: background-color 0.2s;
-        }}
-        .toggle-btn:hover {{
+        }
+        .toggle-btn:hover {
             background-color: #0056b3;
-        }}
-        .hidden {{
+        }
+        .response-toggle > summary {
+            display: inline-block;
+            list-style: none;
+        }
+        .response-toggle > summary::-webkit-details-marker {
             display: none;
-        }}
-        .confusion-matrix {{
+        }
+        .confusion-matrix {
             display: grid;
             grid-template-columns: repeat(2, 1fr);
             gap: 10px;
             margin-top: 10px;
-        }}
-        .matrix-cell {{
+        }
+        .matrix-cell {
             padding: 10px;
             text-align: center;
             border-radius: 3px;
             font-weight: bold;
-        }}
-        .matrix-header {{
+        }
+        .matrix-header {
             background-color: #f8f9fa;
             font-weight: bold;
-        }}
-        .matrix-tp {{
+        }
+        .matrix-tp {
             background-color: #d4edda;
-        }}
-        .matrix-fp {{
+        }
+        .matrix-fp {
             background-color: #f8d7da;
-        }}
-        .matrix-tn {{
+        }
+        .matrix-tn {
             background-color: #d4edda;
-        }}
-        .matrix-fn {{
+        }
+        .matrix-fn {
             background-color: #f8d7da;
-        }}
+        }
         /* 侧边栏样式 */
-        .sidebar {{
+        .sidebar {
             position: fixed;
             left: -300px;
             top: 0;
@@ -229,132 +289,142 @@ def generate_html_report_content(
             z-index: 1000;
             padding: 20px;
             overflow-y: auto;
-        }}
-        .sidebar:hover {{
+        }
+        .sidebar:hover {
             left: 0;
-        }}
-        .sidebar-header {{
+        }
+        .sidebar-header {
             font-size: 1.2em;
             font-weight: bold;
             margin-bottom: 15px;
             padding-bottom: 10px;
             border-bottom: 1px solid #eee;
-        }}
-        .sidebar-content {{
+        }
+        .sidebar-content {
             margin-top: 20px;
-        }}
-        .nav-item {{
+        }
+        .nav-item {
             margin: 10px 0;
             padding: 8px;
             border-radius: 3px;
             cursor: pointer;
             transition: background-color 0.2s;
-        }}
-        .nav-item:hover {{
+        }
+        .nav-item:hover {
             background-color: #f8f9fa;
-        }}
-        .nav-item.active {{
+        }
+        .nav-item.active {
             background-color: #e9ecef;
             font-weight: bold;
-        }}
+        }
         /* 评估指标详情样式 */
-        .metrics-detail {{
+        .metrics-detail {
             background-color: #fff;
             padding: 20px;
             border-radius: 5px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
             margin-bottom: 30px;
-        }}
-        .metrics-grid {{
+        }
+        .metrics-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
             gap: 20px;
-        }}
-        .metric-detail-item {{
+        }
+        .metric-detail-item {
             padding: 15px;
             border-radius: 5px;
             background-color: #f8f9fa;
-        }}
-        .metric-detail-label {{
+        }
+        .metric-detail-label {
             font-weight: bold;
             color: #495057;
-        }}
-        .metric-detail-value {{
+        }
+        .metric-detail-value {
             font-size: 1.2em;
             color: #007bff;
             margin-top: 5px;
-        }}
-        .metric-detail-description {{
+        }
+        .metric-detail-description {
             font-size: 0.9em;
             color: #6c757d;
             margin-top: 5px;
-        }}
+        }
         /* 样本筛选样式 */
-        .filter-container {{
+        .filter-container {
             background-color: #fff;
             padding: 20px;
             border-radius: 5px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
             margin-bottom: 30px;
-        }}
-        .filter-buttons {{
+        }
+        .filter-buttons {
             display: flex;
             gap: 10px;
             margin-bottom: 15px;
-        }}
-        .filter-btn {{
+        }
+        .filter-btn {
             padding: 8px 16px;
             border: none;
             border-radius: 3px;
             cursor: pointer;
             transition: all 0.2s;
             font-weight: bold;
-        }}
-        .filter-btn.active {{
+        }
+        .filter-btn.active {
             color: white;
-        }}
-        .filter-btn.tp {{
+        }
+        .filter-btn.tp {
             background-color: #d4edda;
             color: #155724;
-        }}
-        .filter-btn.tp.active {{
+        }
+        .filter-btn.tp.active {
             background-color: #28a745;
-        }}
-        .filter-btn.fp {{
+        }
+        .filter-btn.fp {
             background-color: #f8d7da;
             color: #721c24;
-        }}
-        .filter-btn.fp.active {{
+        }
+        .filter-btn.fp.active {
             background-color: #dc3545;
-        }}
-        .filter-btn.tn {{
+        }
+        .filter-btn.tn {
             background-color: #d4edda;
             color: #155724;
-        }}
-        .filter-btn.tn.active {{
+        }
+        .filter-btn.tn.active {
             background-color: #28a745;
-        }}
-        .filter-btn.fn {{
+        }
+        .filter-btn.fn {
             background-color: #f8d7da;
             color: #721c24;
-        }}
-        .filter-btn.fn.active {{
+        }
+        .filter-btn.fn.active {
             background-color: #dc3545;
-        }}
-        .filter-btn.all {{
+        }
+        .filter-btn.all {
             background-color: #e9ecef;
             color: #495057;
-        }}
-        .filter-btn.all.active {{
+        }
+        .filter-btn.all.active {
             background-color: #6c757d;
             color: white;
-        }}
-        .sample-count {{
+        }
+        .sample-count {
             font-size: 0.9em;
             color: #6c757d;
             margin-top: 10px;
-        }}
-    </style>
+        }
+    </style>"""
+
+# 报告头部模板，使用$占位符
+_HTML_HEADER_TMPL = string.Template("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>对话意图识别结果报告</title>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+$style
 </head>
 <body>
     <!-- 侧边栏 -->
@@ -363,16 +433,16 @@ def generate_html_report_content(
         <div class="sidebar-content">
             <div class="nav-item" onclick="scrollToSection('header')">基本信息</div>
             <div class="nav-item" onclick="scrollToSection('system-prompt')">系统提示词</div>
-            {f'<div class="nav-item" onclick="scrollToSection(\'metrics\')">评估指标</div>' if metrics else ''}
+            $metrics_nav
             <div class="nav-item" onclick="scrollToSection('results')">处理结果</div>
         </div>
     </div>
 
     <div id="header" class="header">
         <h1>对话意图识别结果报告</h1>
-        <p>生成时间: {now}</p>
-        <p>模型: {model_name}</p>
-        <p>处理提示词数量: {len(summary)}</p>
+        <p>生成时间: $now</p>
+        <p>模型: $model_name</p>
+        <p>处理提示词数量: $n_summary</p>
     </div>
     
     <div id="system-prompt" class="system-prompt-container">
@@ -380,134 +450,21 @@ def generate_html_report_content(
             <h2 style="margin: 0;">系统提示词</h2>
             <span class="toggle-icon">▼</span>
         </div>
-        <div class="system-prompt-content">{system_prompt}</div>
+        <div class="system-prompt-content">$system_prompt</div>
     </div>
     
-    {f'''
-    <div id="metrics">
-        <h2>评估指标</h2>
-        <div class="metrics-container">
-            <div class="metric-card">
-                <div class="metric-value">{metrics.get('metrics', {}).get('accuracy', 0):.2%}</div>
-                <div class="metric-label">准确率 (Accuracy)</div>
-            </div>
-            <div class="metric-card">
-                <div class="metric-value">{metrics.get('metrics', {}).get('precision', 0):.2%}</div>
-                <div class="metric-label">精确率 (Precision)</div>
-            </div>
-            <div class="metric-card">
-                <div class="metric-value">{metrics.get('metrics', {}).get('recall', 0):.2%}</div>
-                <div class="metric-label">召回率 (Recall)</div>
-            </div>
-            <div class="metric-card">
-                <div class="metric-value">{metrics.get('metrics', {}).get('f1', 0):.2%}</div>
-                <div class="metric-label">F1分数</div>
-            </div>
-        </div>
-        
-        <div class="metrics-detail">
-            <h3>详细评估指标</h3>
-            <div class="metrics-grid">
-                <div class="metric-detail-item">
-                    <div class="metric-detail-label">真正例 (True Positive)</div>
-                    <div class="metric-detail-value">{metrics.get('confusion_matrix', {}).get('TP', 0)}</div>
-                    <div class="metric-detail-description">正确识别为指令的样本数</div>
-                </div>
-                <div class="metric-detail-item">
-                    <div class="metric-detail-label">假正例 (False Positive)</div>
-                    <div class="metric-detail-value">{metrics.get('confusion_matrix', {}).get('FP', 0)}</div>
-                    <div class="metric-detail-description">错误识别为指令的样本数</div>
-                </div>
-                <div class="metric-detail-item">
-                    <div class="metric-detail-label">真负例 (True Negative)</div>
-                    <div class="metric-detail-value">{metrics.get('confusion_matrix', {}).get('TN', 0)}</div>
-                    <div class="metric-detail-description">正确识别为非指令的样本数</div>
-                </div>
-                <div class="metric-detail-item">
-                    <div class="metric-detail-label">假负例 (False Negative)</div>
-                    <div class="metric-detail-value">{metrics.get('confusion_matrix', {}).get('FN', 0)}</div>
-                    <div class="metric-detail-description">错误识别为非指令的样本数</div>
-                </div>
-            </div>
-        </div>
-        
-        <div class="chart-container">
-            <h3>混淆矩阵</h3>
-            <div class="confusion-matrix">
-                <div class="matrix-cell matrix-header">预测值</div>
-                <div class="matrix-cell matrix-header">真实值</div>
-                <div class="matrix-cell matrix-tp">TP: {metrics.get('confusion_matrix', {}).get('TP', 0)}</div>
-                <div class="matrix-cell matrix-fp">FP: {metrics.get('confusion_matrix', {}).get('FP', 0)}</div>
-                <div class="matrix-cell matrix-tn">TN: {metrics.get('confusion_matrix', {}).get('TN', 0)}</div>
-                <div class="matrix-cell matrix-fn">FN: {metrics.get('confusion_matrix', {}).get('FN', 0)}</div>
-            </div>
-        </div>
-    </div>
-    ''' if metrics else ''}
+    $metrics_section
     
     <div id="results">
         <h2>处理结果</h2>
-        {f'''
-        <div class="filter-container">
-            <div class="filter-buttons">
-                <button class="filter-btn all active" onclick="filterSamples('all')">全部</button>
-                <button class="filter-btn tp" onclick="filterSamples('TP')">真正例 (TP)</button>
-                <button class="filter-btn fp" onclick="filterSamples('FP')">假正例 (FP)</button>
-                <button class="filter-btn tn" onclick="filterSamples('TN')">真负例 (TN)</button>
-                <button class="filter-btn fn" onclick="filterSamples('FN')">假负例 (FN)</button>
-            </div>
-            <div class="sample-count">显示 <span id="sample-count">0</span> 个样本</div>
-        </div>
-        ''' if metrics and metrics.get('samples') else ''}
+        $filter_section
         <button class="toggle-btn" onclick="toggleAllResponses()">展开/折叠所有响应</button>
         
         <div id="results-content">
-"""
-    
-    # 添加每个提示词和响应
-    for item in summary:
-        prompt_id = item.get("prompt_id", "")
-        prompt = item.get("prompt", "")
-        response = item.get("response", "")
-        output_file = item.get("output_file", "")
-        category = item.get("category", "")
-        
-        # 尝试解析响应为JSON
-        try:
-            response_json = json.loads(response)
-            response_formatted = json.dumps(response_json, ensure_ascii=False, indent=2)
-            is_json = True
-        except:
-            response_formatted = response
-            is_json = False
-        
-        # 尝试解析提示词为JSON（如果是对话格式）
-        try:
-            prompt_json = json.loads(prompt)
-            if isinstance(prompt_json, dict) and "dialog" in prompt_json:
-                prompt_formatted = json.dumps(prompt_json, ensure_ascii=False, indent=2)
-                is_dialog = True
-            else:
-                prompt_formatted = prompt
-                is_dialog = False
-        except:
-            prompt_formatted = prompt
-            is_dialog = False
-        
-        html_content += f"""
-        <div class="result-item" id="result-{prompt_id}" data-category="{category}">
-            <h3>提示词 #{prompt_id}</h3>
-            <div class="prompt {'json' if is_dialog else ''}">{prompt_formatted}</div>
-            <button class="toggle-btn" onclick="toggleResponse('response-{prompt_id}')">显示/隐藏响应</button>
-            <div id="response-{prompt_id}" class="response {'hidden' if prompt_id > 5 else ''}">
-                <div class="{'json' if is_json else ''}">{response_formatted}</div>
-            </div>
-            <div class="meta">输出文件: {os.path.basename(output_file)}</div>
-        </div>
-"""
-    
-    # 添加页脚和JavaScript
-    html_content += """
+""")
+
+# 结果数据之前的页面片段，结果数据以JSON形式嵌入其后
+_HTML_DATA_OPEN = """
         </div>
     </div>
     
@@ -515,26 +472,122 @@ def generate_html_report_content(
         <p>由Ollama对话意图识别工具生成</p>
     </div>
     
+    <script id="report-data" type="application/json">""".encode("utf-8")
+
+# 报告页脚，包含渲染结果所需的JavaScript
+_HTML_FOOTER = """</script>
     <script>
-        function toggleResponse(id) {
-            const element = document.getElementById(id);
-            if (element.classList.contains('hidden')) {
-                element.classList.remove('hidden');
+        const RESULTS = JSON.parse(document.getElementById('report-data').textContent);
+        // 每批渲染的结果数量，其余结果在滚动到列表末尾时再追加
+        const BATCH_SIZE = 200;
+        let filteredResults = [];
+        let renderedCount = 0;
+        // 展开/折叠所有响应后，后续追加的结果沿用该状态
+        let responsesExpanded = null;
+        const sentinel = document.createElement('div');
+        const sentinelObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                appendResults();
+            }
+        }, { rootMargin: '500px' });
+
+        function createResultItem(item) {
+            const div = document.createElement('div');
+            div.className = 'result-item';
+            div.id = `result-${item.id}`;
+            div.dataset.category = item.category;
+
+            const title = document.createElement('h3');
+            title.textContent = `提示词 #${item.id}`;
+            div.appendChild(title);
+
+            const prompt = document.createElement('div');
+            prompt.className = item.is_dialog ? 'prompt json' : 'prompt';
+            prompt.textContent = item.prompt;
+            div.appendChild(prompt);
+
+            // 使用原生<details>折叠响应，无需逐条绑定点击事件
+            const details = document.createElement('details');
+            details.className = 'response-toggle';
+            const summary = document.createElement('summary');
+            summary.className = 'toggle-btn';
+            summary.textContent = '显示/隐藏响应';
+            details.appendChild(summary);
+
+            const response = document.createElement('div');
+            response.className = 'response';
+            const body = document.createElement('div');
+            body.className = item.is_json ? 'json' : '';
+            response.appendChild(body);
+            details.appendChild(response);
+            const open = responsesExpanded === null ? !(item.id > 5) : responsesExpanded;
+            if (!open) {
+                // 默认折叠的响应在首次展开时再格式化
+                details.pendingItem = item;
             } else {
-                element.classList.add('hidden');
+                details.open = true;
+                body.textContent = formatResponse(item);
+            }
+            div.appendChild(details);
+
+            // 汇总模式下没有单独的响应文件
+            if (item.file) {
+                const meta = document.createElement('div');
+                meta.className = 'meta';
+                meta.textContent = `输出文件: ${item.file}`;
+                div.appendChild(meta);
             }
+
+            return div;
         }
-        
+
+        function formatResponse(item) {
+            return item.is_json ? JSON.stringify(item.response, null, 2) : item.response;
+        }
+
+        function fillResponse(details) {
+            if (details.pendingItem) {
+                details.lastElementChild.firstElementChild.textContent = formatResponse(details.pendingItem);
+                details.pendingItem = null;
+            }
+        }
+
+        function appendResults() {
+            const end = Math.min(renderedCount + BATCH_SIZE, filteredResults.length);
+            const fragment = document.createDocumentFragment();
+            for (let i = renderedCount; i < end; i++) {
+                fragment.appendChild(createResultItem(filteredResults[i]));
+            }
+            renderedCount = end;
+
+            const container = document.getElementById('results-content');
+            container.appendChild(fragment);
+            // 重新观察哨兵元素，若追加后仍在视口内会立即触发下一批
+            sentinelObserver.unobserve(sentinel);
+            if (renderedCount < filteredResults.length) {
+                container.appendChild(sentinel);
+                sentinelObserver.observe(sentinel);
+            }
+        }
+
+        function renderResults(category) {
+            filteredResults = category === 'all' ? RESULTS : RESULTS.filter(item => item.category === category);
+            renderedCount = 0;
+            document.getElementById('results-content').replaceChildren();
+            appendResults();
+            return filteredResults.length;
+        }
+
         function toggleAllResponses() {
-            const responses = document.querySelectorAll('.response');
-            const allHidden = Array.from(responses).every(el => el.classList.contains('hidden'));
+            const responses = document.querySelectorAll('.response-toggle');
+            const allHidden = Array.from(responses).every(el => !el.open);
+            responsesExpanded = allHidden;
             
             responses.forEach(el => {
                 if (allHidden) {
-                    el.classList.remove('hidden');
-                } else {
-                    el.classList.add('hidden');
+                    fillResponse(el);
                 }
+                el.open = allHidden;
             });
         }
 
@@ -552,21 +605,8 @@ def generate_html_report_content(
             });
             document.querySelector(`.filter-btn.${category.toLowerCase()}`).classList.add('active');
             
-            // 筛选样本
-            const items = document.querySelectorAll('.result-item');
-            let visibleCount = 0;
-            
-            items.forEach(item => {
-                if (category === 'all' || item.dataset.category === category) {
-                    item.style.display = 'block';
-                    visibleCount++;
-                } else {
-                    item.style.display = 'none';
-                }
-            });
-            
-            // 更新样本计数
-            document.getElementById('sample-count').textContent = visibleCount;
+            // 按类别重新渲染样本并更新样本计数
+            document.getElementById('sample-count').textContent = renderResults(category);
         }
 
         function scrollToSection(sectionId) {
@@ -598,20 +638,206 @@ def generate_html_report_content(
             });
         }
 
+        // toggle事件不冒泡，在捕获阶段统一处理所有响应的首次展开
+        document.getElementById('results-content').addEventListener('toggle', event => {
+            if (event.target.open) {
+                fillResponse(event.target);
+            }
+        }, true);
         // 监听滚动事件
         window.addEventListener('scroll', updateActiveNavItem);
         // 初始化活动项
         updateActiveNavItem();
-        // 初始化样本计数
+        // 首次渲染处理结果并初始化样本计数
         if (document.querySelector('.filter-container')) {
             filterSamples('all');
+        } else {
+            renderResults('all');
         }
     </script>
 </body>
 </html>
-"""
+""".encode("utf-8")
+
+
+def _parse_response(response: Any) -> Tuple[Any, bool]:
+    """解析单个响应
+    
+    Args:
+        response: 响应内容，可以是字符串或已解析的Python对象
+        
+    Returns:
+        元组(解析结果, 是否为有效JSON)
+    """
+    # 如果已经是Python对象，也视为有效JSON
+    if isinstance(response, (dict, list)):
+        return response, True
+    # 明显不是JSON的文本直接跳过解析
+    if quick_json_reject(response):
+        return None, False
+    try:
+        return loads(response), True
+    except ValueError:
+        return None, False
+
+
+def _path_tail(path: str) -> str:
+    """取路径中的文件名部分，同时兼容/和\\分隔符
+    
+    Args:
+        path: 文件路径
+        
+    Returns:
+        文件名，路径为空时返回空字符串
+    """
+    return path.rpartition("/")[2].rpartition("\\")[2]
+
+
+def parse_responses(summary: list) -> List[Tuple[Any, bool]]:
+    """解析摘要中的所有响应，每个响应只解析一次
+    
+    Args:
+        summary: 摘要数据
+        
+    Returns:
+        与summary一一对应的(解析结果, 是否为有效JSON)列表
+    """
+    return [_parse_response(item.get("response", "")) for item in summary]
+
+
+def _render_metrics_section(metrics: Dict[str, Any]) -> str:
+    """生成评估指标部分的HTML
+    
+    Args:
+        metrics: 评估指标
+        
+    Returns:
+        评估指标部分的HTML片段
+    """
+    scores = metrics.get("metrics") or {}
+    cm = metrics.get("confusion_matrix") or {}
+    # 百分比在代入前换算好，由一次%格式化完成整个指标部分
+    return _METRICS_SECTION_TMPL % {
+        "accuracy": scores.get("accuracy", 0) * 100,
+        "precision": scores.get("precision", 0) * 100,
+        "recall": scores.get("recall", 0) * 100,
+        "f1": scores.get("f1", 0) * 100,
+        "tp": cm.get("TP", 0),
+        "fp": cm.get("FP", 0),
+        "tn": cm.get("TN", 0),
+        "fn": cm.get("FN", 0)
+    }
+
+
+def _render_report(
+    write: Callable[[bytes], Any],
+    summary: list,
+    model_name: str,
+    system_prompt: str,
+    metrics: Optional[Dict[str, Any]] = None,
+    parsed_responses: Optional[List[Tuple[Any, bool]]] = None
+) -> None:
+    """将HTML报告逐段写出
+    
+    Args:
+        write: 接收UTF-8编码HTML片段的写入函数，例如二进制文件对象的write方法
+        summary: 摘要数据
+        model_name: 模型名称
+        system_prompt: 系统提示词
+        metrics: 评估指标（可选）
+        parsed_responses: parse_responses的结果（可选），未提供时在此解析
+    """
+    if parsed_responses is None:
+        parsed_responses = parse_responses(summary)
+    
+    # 预先计算模板中用到的不变量
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    n_summary = len(summary)
+    has_samples = bool(metrics and metrics.get("samples"))
+
+    # 汇总模板所需的变量
+    ctx = {
+        "style": _STYLE_BLOCK,
+        "now": now,
+        "model_name": str(model_name).translate(_HTML_ESCAPE_TABLE),
+        "n_summary": n_summary,
+        "system_prompt": str(system_prompt).translate(_HTML_ESCAPE_TABLE),
+        "metrics_nav": _METRICS_NAV_HTML if metrics else "",
+        "metrics_section": _render_metrics_section(metrics) if metrics else "",
+        "filter_section": _FILTER_SECTION_HTML if has_samples else "",
+    }
+    
+    # 写入报告头部
+    write(_HTML_HEADER_TMPL.substitute(ctx).encode("utf-8"))
+    
+    # 逐条写入提示词和响应数据，交由浏览器端渲染
+    write(_HTML_DATA_OPEN)
+    for index, item in enumerate(summary):
+        prompt_id = item.get("prompt_id", "")
+        prompt = item.get("prompt", "")
+        response = item.get("response", "")
+        output_file = item.get("output_file", "")
+        category = item.get("category", "")
+        
+        # JSON响应以对象形式紧凑嵌入，由浏览器在显示时缩进格式化
+        response_json, is_json = parsed_responses[index]
+        response_value = response_json if is_json else response
+        
+        # 尝试解析提示词为JSON（如果是对话格式）
+        prompt_formatted = prompt
+        is_dialog = False
+        # 不含"dialog"键的文本不可能是对话格式，无需解析
+        if not quick_json_reject(prompt) and '"dialog"' in prompt:
+            try:
+                prompt_json = loads(prompt)
+                if isinstance(prompt_json, dict) and "dialog" in prompt_json:
+                    prompt_formatted = dumps(prompt_json, indent=True)
+                    is_dialog = True
+            except ValueError:
+                pass
+        
+        row = {
+            "id": prompt_id,
+            "prompt": prompt_formatted,
+            "is_dialog": is_dialog,
+            "response": response_value,
+            "is_json": is_json,
+            "category": category,
+            "file": _path_tail(output_file) if output_file else "",
+        }
+        # 嵌入<script>标签时把"<"写成\u003c，数据中的"</script>"和"<!--"都不会改变HTML解析状态
+        write(b"," if index else b"[")
+        write(dumps_bytes(row).replace(b"<", b"\\u003c"))
+    write(b"]")
+    
+    # 写入页脚和JavaScript
+    write(_HTML_FOOTER)
+
+
+def generate_html_report_content(
+    summary: list, 
+    model_name: str, 
+    system_prompt: str,
+    metrics: Optional[Dict[str, Any]] = None
+) -> str:
+    """生成HTML报告内容
     
-    return html_content
+    Args:
+        summary: 摘要数据
+        model_name: 模型名称
+        system_prompt: 系统提示词
+        metrics: 评估指标（可选）
+        
+    Returns:
+        HTML内容字符串
+    """
+    if not summary:
+        return ""
+    
+    # 收集片段后一次性拼接，只分配一次最终字符串
+    parts: List[bytes] = []
+    _render_report(parts.append, summary, model_name, system_prompt, metrics)
+    return b"".join(parts).decode("utf-8")
 
 
 def generate_html_report(
@@ -619,7 +845,9 @@ def generate_html_report(
     output_dir: str, 
     model_name: str, 
     system_prompt: str,
-    metrics: Optional[Dict[str, Any]] = None
+    metrics: Optional[Dict[str, Any]] = None,
+    parsed_responses: Optional[List[Tuple[Any, bool]]] = None,
+    compress: bool = False
 ) -> Optional[str]:
     """生成HTML报告文件
     
@@ -629,6 +857,9 @@ def generate_html_report(
         model_name: 模型名称
         system_prompt: 系统提示词
         metrics: 评估指标（可选）
+        parsed_responses: parse_responses的结果（可选），用于避免重复解析响应
+        compress: 是否写出gzip压缩的report.html.gz，适合通过HTTP提供的大型报告；
+            默认写出可直接在浏览器中打开的report.html
         
     Returns:
         生成的HTML文件路径，如果失败则返回None
@@ -639,13 +870,18 @@ def generate_html_report(
     # 创建HTML文件路径
     html_file = os.path.join(output_dir, "report.html")
     
-    # 生成HTML内容
-    html_content = generate_html_report_content(summary, model_name, system_prompt, metrics)
-    
-    # 写入HTML文件
+    # 将HTML内容直接流式写入文件
     try:
-        with open(html_file, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        f: Union[gzip.GzipFile, BinaryIO]
+        if compress:
+            # 使用最低压缩级别，压缩开销远小于节省的写入量
+            html_file += ".gz"
+            f = gzip.open(html_file, "wb", compresslevel=1)
+        else:
+            # 片段已是UTF-8字节，二进制写入省去文本层的再次编码
+            f = open(html_file, "wb", buffering=1 << 20)
+        with f:
+            _render_report(f.write, summary, model_name, system_prompt, metrics, parsed_responses)
         
         print(f"已生成HTML报告: {html_file}")
         return html_file
@@ -5,11 +5,67 @@
 """
 import json
 import logging
+from functools import lru_cache
 from typing import List, Dict, Any, Tuple, Optional
 
+from src.utils.json_utils import loads, quick_json_reject
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 样本分类表，按[预测结果][真实标签]索引
+_CATEGORY_NAMES = (
+    ("TN", "FN"),  # 预测不是指令：实际不是指令为真负例，实际是指令为假负例
+    ("FP", "TP"),  # 预测为指令：实际不是指令为假正例，实际是指令为真正例
+)
+
+
+def _prediction_from_data(json_data: Any, response: Any) -> Optional[bool]:
+    """从已解析的响应数据中提取预测结果
+    
+    Args:
+        json_data: 解析后的响应数据
+        response: 原始响应，用于日志输出
+        
+    Returns:
+        提取的预测结果 (True/False)
+    """
+    # 处理数组格式
+    if isinstance(json_data, list) and len(json_data) > 0:
+        # 获取数组中的第一个元素
+        first_item = json_data[0]
+        if isinstance(first_item, dict) and "has_command" in first_item:
+            return first_item["has_command"]
+    
+    # 处理对象格式
+    if isinstance(json_data, dict):
+        if "has_command" in json_data:
+            return json_data["has_command"]
+    
+    logger.warning(f"无法从响应中提取预测结果，使用默认值False: {response}")
+    return False
+
+
+@lru_cache(maxsize=4096)
+def _extract_prediction_from_text(response: str) -> Optional[bool]:
+    """解析响应文本并提取预测结果，相同的响应文本只解析一次
+    
+    Args:
+        response: 模型响应文本
+        
+    Returns:
+        提取的预测结果 (True/False)
+    """
+    # 不含has_command键的文本无论能否解析都无法提取预测结果
+    if '"has_command"' not in response:
+        logger.warning(f"无法从响应中提取预测结果，使用默认值False: {response}")
+        return False
+    try:
+        return _prediction_from_data(loads(response), response)
+    except Exception as e:
+        logger.error(f"解析模型响应时出错，使用默认值False: {e}")
+        return False
+
 
 def extract_prediction(response: str) -> Optional[bool]:
     """从模型响应中提取预测结果
@@ -20,37 +76,27 @@ def extract_prediction(response: str) -> Optional[bool]:
     Returns:
         提取的预测结果 (True/False)，如果提取失败则返回None
     """
+    if isinstance(response, str):
+        return _extract_prediction_from_text(response)
     try:
-        # 尝试将响应解析为JSON
-        if isinstance(response, str):
-            json_data = json.loads(response)
-        else:
-            json_data = response
-            
-        # 处理数组格式
-        if isinstance(json_data, list) and len(json_data) > 0:
-            # 获取数组中的第一个元素
-            first_item = json_data[0]
-            if isinstance(first_item, dict) and "has_command" in first_item:
-                return first_item["has_command"]
-        
-        # 处理对象格式
-        if isinstance(json_data, dict):
-            if "has_command" in json_data:
-                return json_data["has_command"]
-            
-            # 对于可能嵌套的JSON结构
-            for key, value in json_data.items():
-                if key == "has_command":
-                    return value
-        
-        logger.warning(f"无法从响应中提取预测结果，使用默认值False: {response}")
-        return False
+        return _prediction_from_data(response, response)
     except Exception as e:
         logger.error(f"解析模型响应时出错，使用默认值False: {e}")
         return False
 
 
+def _canonical_dialog(dialog: Any) -> str:
+    """生成对话内容的规范化字符串，键按字母排序，用于忽略序列化顺序差异的查找
+    
+    Args:
+        dialog: 对话内容
+        
+    Returns:
+        规范化的JSON字符串
+    """
+    return json.dumps(dialog, ensure_ascii=False, sort_keys=True)
+
+
 def compute_confusion_matrix(
     predictions: List[bool], 
     ground_truth: List[bool]
@@ -64,30 +110,27 @@ def compute_confusion_matrix(
     Returns:
         混淆矩阵字典 (TP, FP, TN, FN)
     """
-    # 初始化混淆矩阵
+    # 由三次C层求和推出四项计数：TP为两者同真的数量，其余由边际和相减得到
+    total = len(predictions)
+    predicted_positive = sum(map(bool, predictions))
+    actual_positive = sum(map(bool, ground_truth))
+    tp = sum(map(all, zip(predictions, ground_truth)))
+    fp = predicted_positive - tp
+    fn = actual_positive - tp
+    tn = total - predicted_positive - fn
+    
     confusion_matrix = {
-        "TP": 0,  # 真正例：预测为指令且实际为指令
-        "FP": 0,  # 假正例：预测为指令但实际不是指令
-        "TN": 0,  # 真负例：预测不是指令且实际不是指令
-        "FN": 0   # 假负例：预测不是指令但实际是指令
+        "TP": tp,  # 真正例：预测为指令且实际为指令
+        "FP": fp,  # 假正例：预测为指令但实际不是指令
+        "TN": tn,  # 真负例：预测不是指令且实际不是指令
+        "FN": fn   # 假负例：预测不是指令但实际是指令
     }
     
-    # 填充混淆矩阵
-    for pred, gt in zip(predictions, ground_truth):
-        if pred and gt:
-            confusion_matrix["TP"] += 1
-        elif pred and not gt:
-            confusion_matrix["FP"] += 1
-        elif not pred and gt:
-            confusion_matrix["FN"] += 1
-        else:  # not pred and not gt
-            confusion_matrix["TN"] += 1
-    
     # 输出调试信息
     logger.info(f"混淆矩阵: {confusion_matrix}")
-    logger.info(f"总样本数: {len(predictions)}")
-    logger.info(f"预测为指令的样本数: {sum(1 for p in predictions if p)}")
-    logger.info(f"实际为指令的样本数: {sum(1 for g in ground_truth if g)}")
+    logger.info(f"总样本数: {total}")
+    logger.info(f"预测为指令的样本数: {predicted_positive}")
+    logger.info(f"实际为指令的样本数: {actual_positive}")
     
     return confusion_matrix
 
@@ -106,18 +149,23 @@ def compute_metrics(confusion_matrix: Dict[str, int]) -> Dict[str, float]:
     TN = confusion_matrix["TN"]
     FN = confusion_matrix["FN"]
     
-    # 准确率 (Accuracy) = (TP + TN) / (TP + TN + FP + FN)
+    # 各指标的分母只计算一次
     total = TP + TN + FP + FN
-    accuracy = (TP + TN) / total if total > 0 else 0
+    predicted_positive = TP + FP
+    actual_positive = TP + FN
+    
+    # 准确率 (Accuracy) = (TP + TN) / (TP + TN + FP + FN)
+    accuracy = (TP + TN) / total if total else 0
     
     # 精确率 (Precision) = TP / (TP + FP)
-    precision = TP / (TP + FP) if (TP + FP) > 0 else 0
+    precision = TP / predicted_positive if predicted_positive else 0
     
     # 召回率 (Recall) = TP / (TP + FN)
-    recall = TP / (TP + FN) if (TP + FN) > 0 else 0
+    recall = TP / actual_positive if actual_positive else 0
     
     # F1分数 = 2 * (precision * recall) / (precision + recall)
-    f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
+    pr_sum = precision + recall
+    f1 = 2 * (precision * recall) / pr_sum if pr_sum else 0
     
     return {
         "accuracy": accuracy,
@@ -147,11 +195,14 @@ def evaluate_model_predictions(
     
     # 如果提供了数据集文件，则加载真实标签
     gt_map = {}
+    # 规范化对话内容到真实标签的映射，仅在精确匹配失败时才构建
+    gt_by_dialog = None
     dataset = []
     if dataset_file:
         try:
-            with open(dataset_file, "r", encoding="utf-8") as f:
-                dataset = json.load(f)
+            # 以字节读取并直接解析，省去先解码成完整字符串的中间副本
+            with open(dataset_file, "rb") as f:
+                dataset = loads(f.read())
             
             logger.info(f"已加载原始数据集，包含 {len(dataset)} 个样本")
             
@@ -180,15 +231,18 @@ def evaluate_model_predictions(
         # 查找对应的真实标签
         gt = None
         
+        # 提示词只解析一次，后续的标签查找共用解析结果；明显不是JSON的文本直接跳过
+        prompt_data = None
+        if not quick_json_reject(prompt):
+            try:
+                prompt_data = loads(prompt)
+            except ValueError as e:
+                logger.debug(f"从提示词解析真实标签失败: {e}")
+        
         # 首先尝试从提示词中解析（兼容旧格式）
-        try:
-            if isinstance(prompt, str):
-                prompt_data = json.loads(prompt)
-                if "has_command" in prompt_data:
-                    gt = prompt_data["has_command"]
-                    logger.debug(f"从提示词中解析到真实标签: {gt}")
-        except Exception as e:
-            logger.debug(f"从提示词解析真实标签失败: {e}")
+        if isinstance(prompt_data, dict) and "has_command" in prompt_data:
+            gt = prompt_data["has_command"]
+            logger.debug(f"从提示词中解析到真实标签: {gt}")
         
         # 如果没有找到真实标签，则尝试从数据集映射中查找
         if gt is None and gt_map:
@@ -197,18 +251,17 @@ def evaluate_model_predictions(
                 gt = gt_map.get(prompt)
                 if gt is not None:
                     logger.debug(f"从映射表中找到真实标签: {gt}")
-                else:
-                    # 如果找不到，可能是由于JSON序列化的细微差异，尝试遍历比较
-                    for orig_prompt, orig_gt in gt_map.items():
-                        try:
-                            orig_data = json.loads(orig_prompt)
-                            prompt_data = json.loads(prompt)
-                            if orig_data.get("dialog") == prompt_data.get("dialog"):
-                                gt = orig_gt
-                                logger.debug(f"通过对话内容匹配找到真实标签: {gt}")
-                                break
-                        except Exception:
-                            continue
+                elif isinstance(prompt_data, dict) and "dialog" in prompt_data:
+                    # 如果找不到，可能是由于JSON序列化的细微差异，按规范化的对话内容查找
+                    if gt_by_dialog is None:
+                        gt_by_dialog = {
+                            _canonical_dialog(d["dialog"]): d.get("has_command", False)
+                            for d in dataset
+                            if "dialog" in d and "has_command" in d
+                        }
+                    gt = gt_by_dialog.get(_canonical_dialog(prompt_data["dialog"]))
+                    if gt is not None:
+                        logger.debug(f"通过对话内容匹配找到真实标签: {gt}")
             except Exception as e:
                 logger.debug(f"从映射表查找真实标签失败: {e}")
         
@@ -225,38 +278,19 @@ def evaluate_model_predictions(
             except Exception as e:
                 logger.debug(f"从原始数据集获取真实标签失败: {e}")
         
-        # 如果找到了真实标签，则添加到评估集合
-        if gt is not None:
-            predictions.append(pred)
-            ground_truth.append(gt)
-            # 添加样本分类信息
-            item["prediction"] = pred
-            item["ground_truth"] = gt
-            # 修正分类逻辑
-            if pred and gt:
-                item["category"] = "TP"  # 真正例：预测为指令且实际为指令
-            elif pred and not gt:
-                item["category"] = "FP"  # 假正例：预测为指令但实际不是指令
-            elif not pred and gt:
-                item["category"] = "FN"  # 假负例：预测不是指令但实际是指令
-            else:
-                item["category"] = "TN"  # 真负例：预测不是指令且实际不是指令
-            valid_samples.append(item)
-            logger.debug(f"样本 {prompt_id} 分类: pred={pred}, gt={gt}, category={item['category']}")
-        else:
+        # 没有找到真实标签时使用默认值False
+        if gt is None:
             logger.warning(f"无法获取真实标签，使用默认值False: prompt_id={prompt_id}")
-            predictions.append(pred)
-            ground_truth.append(False)  # 使用默认值False
-            # 添加样本分类信息
-            item["prediction"] = pred
-            item["ground_truth"] = False
-            # 修正分类逻辑
-            if pred:
-                item["category"] = "FP"  # 假正例：预测为指令但实际不是指令
-            else:
-                item["category"] = "TN"  # 真负例：预测不是指令且实际不是指令
-            valid_samples.append(item)
-            logger.debug(f"样本 {prompt_id} 分类(无真实标签): pred={pred}, gt=False, category={item['category']}")
+            gt = False
+        
+        # 添加到评估集合并记录样本分类信息
+        predictions.append(pred)
+        ground_truth.append(gt)
+        item["prediction"] = pred
+        item["ground_truth"] = gt
+        item["category"] = _CATEGORY_NAMES[bool(pred)][bool(gt)]
+        valid_samples.append(item)
+        logger.debug(f"样本 {prompt_id} 分类: pred={pred}, gt={gt}, category={item['category']}")
     
     # 如果没有有效样本，返回零值指标
     if not predictions:
@@ -4,15 +4,26 @@
 文件处理工具函数
 """
 import os
+import re
 import json
-import glob
 import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, cast
+
+from src.utils.json_utils import dumps_bytes, loads, quick_json_reject
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 已确认存在的目录，避免每次保存文件都调用os.makedirs
+_ensured_dirs: Set[str] = set()
+
+# 响应文件名格式：response_<提示词ID>_<8位十六进制哈希>.json
+_RESPONSE_FILE_RE = re.compile(r"^response_(\d+)_([0-9a-f]{8})\.json$")
+
+# 用于从指定位置解析一个完整JSON值的解码器
+_JSON_DECODER = json.JSONDecoder()
+
 
 def get_existing_responses(output_dir: str) -> Dict[str, str]:
     """获取已存在的响应文件
@@ -29,17 +40,12 @@ def get_existing_responses(output_dir: str) -> Dict[str, str]:
     if not os.path.exists(output_dir):
         return existing_responses
     
-    # 查找所有响应文件
-    response_files = glob.glob(os.path.join(output_dir, "response_*_*.json"))
-    
-    for file_path in response_files:
-        # 从文件名中提取哈希值
-        file_name = os.path.basename(file_path)
-        parts = file_name.split("_")
-        if len(parts) >= 3:
-            # 提取哈希值（去掉.json后缀）
-            hash_value = parts[2].replace(".json", "")
-            existing_responses[hash_value] = file_path
+    # 查找所有响应文件，scandir直接提供文件名，一次正则匹配即可取出哈希值
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            match = _RESPONSE_FILE_RE.match(entry.name)
+            if match and entry.is_file():
+                existing_responses[match.group(2)] = entry.path
     
     logger.info(f"找到 {len(existing_responses)} 个已存在的响应文件")
     return existing_responses
@@ -48,6 +54,18 @@ def get_existing_responses(output_dir: str) -> Dict[str, str]:
 def compute_prompt_hash(prompt: str) -> str:
     """计算提示词的哈希值
     
+    Args:
+        prompt: 提示词
+        
+    Returns:
+        哈希值（8个字符）
+    """
+    return hashlib.blake2s(prompt.encode('utf-8'), digest_size=4).hexdigest()
+
+
+def compute_legacy_prompt_hash(prompt: str) -> str:
+    """计算旧版本使用的提示词哈希值（MD5前8个字符），用于识别旧输出目录中的响应文件
+    
     Args:
         prompt: 提示词
         
@@ -73,7 +91,7 @@ def load_json_file(file_path: str, default: Any = None) -> Any:
         
     try:
         with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            return loads(f.read())
     except json.JSONDecodeError:
         logger.error(f"无法解析JSON文件: {file_path}")
         return default
@@ -82,24 +100,68 @@ def load_json_file(file_path: str, default: Any = None) -> Any:
         return default
 
 
-def save_json_file(file_path: str, data: Any, ensure_ascii: bool = False, indent: int = 2) -> bool:
+def write_bytes_file(file_path: str, data: bytes, atomic: bool = False) -> None:
+    """将字节数据写入文件（覆盖已有内容）
+    
+    直接使用os.open/os.write，不经过Python文件对象的缓冲和文本编码层，
+    适合一次性写入已序列化好的小文件。
+    
+    Args:
+        file_path: 文件路径
+        data: 要写入的字节数据
+        atomic: 是否先写入临时文件再原子替换，中途中断不会留下不完整的目标文件
+        
+    Raises:
+        OSError: 打开或写入文件失败时抛出
+    """
+    target_path = file_path + ".tmp" if atomic else file_path
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(target_path, flags, 0o644)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                # os.write可能只写入部分数据
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        if atomic:
+            os.replace(target_path, file_path)
+    except BaseException:
+        # 原子写入失败时删除临时文件，目标文件保持原内容
+        if atomic:
+            try:
+                os.remove(target_path)
+            except OSError:
+                pass
+        raise
+
+
+def save_json_file(file_path: str, data: Any, ensure_ascii: bool = False, indent: Optional[int] = 2) -> bool:
     """保存数据到JSON文件
     
     Args:
         file_path: 文件路径
         data: 要保存的数据
         ensure_ascii: 是否确保ASCII编码（默认False，支持中文）
-        indent: 缩进空格数
+        indent: 缩进空格数，为None时输出紧凑格式
         
     Returns:
         保存是否成功
     """
     try:
-        # 确保目录存在
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # 确保目录存在，同一目录只创建一次
+        dir_path = os.path.dirname(file_path)
+        if dir_path and dir_path not in _ensured_dirs:
+            os.makedirs(dir_path, exist_ok=True)
+            _ensured_dirs.add(dir_path)
         
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=ensure_ascii, indent=indent)
+        if not ensure_ascii and indent in (2, None):
+            # 默认格式和紧凑格式直接以二进制写入序列化结果，省去文本层的编码
+            write_bytes_file(file_path, dumps_bytes(data, indent=indent == 2))
+        else:
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=ensure_ascii, indent=indent)
         return True
     except Exception as e:
         logger.error(f"保存JSON文件时出错: {file_path}, 错误: {e}")
@@ -109,9 +171,11 @@ def save_json_file(file_path: str, data: Any, ensure_ascii: bool = False, indent
 def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     """从文本中提取JSON内容
     
-    尝试两种方法：
+    尝试三种方法：
     1. 直接解析整个文本
     2. 在文本中查找JSON块（{}之间的内容）
+    3. 从第一个'{'开始解析一个完整的JSON对象，忽略其后的多余文本
+       （例如连续输出的第二个对象）
     
     Args:
         text: 输入文本
@@ -119,22 +183,31 @@ def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     Returns:
         解析后的JSON对象，如果无法解析则返回None
     """
-    # 直接尝试解析
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
+    # 直接尝试解析，以说明文字开头的回复明显不是JSON，跳过这次必然失败的解析
+    parsed_whole = not quick_json_reject(text)
+    if parsed_whole:
+        try:
+            return cast(Dict[str, Any], loads(text))
+        except json.JSONDecodeError:
+            pass
     
     # 尝试从文本中提取JSON内容
-    import re
-    try:
-        # 寻找第一个'{'和最后一个'}'之间的JSON内容
-        match = re.search(r'\{[\s\S]*\}', text)
-        if match:
-            json_content = match.group(0)
-            return json.loads(json_content)
-    except (json.JSONDecodeError, AttributeError):
-        pass
+    # 第一个'{'和最后一个'}'之间的内容，用find/rfind定位，无需正则回溯
+    start = text.find('{')
+    end = text.rfind('}')
+    if start != -1 and end > start:
+        # 截取范围与整个文本（去掉首尾空白）相同时，上面已经解析失败过，无需再试
+        if not (parsed_whole and start == len(text) - len(text.lstrip()) and end == len(text.rstrip()) - 1):
+            try:
+                return cast(Dict[str, Any], loads(text[start:end + 1]))
+            except json.JSONDecodeError:
+                pass
+        # 最后一个'}'之后还有其他花括号内容时，截取范围不合法，
+        # 改为从第一个'{'开始解析一个完整对象，忽略其后的多余文本
+        try:
+            return cast(Dict[str, Any], _JSON_DECODER.raw_decode(text, start)[0])
+        except json.JSONDecodeError:
+            pass
     
     # 如果都失败，返回None
     return None 
\ No newline at end of file
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+JSON处理工具函数
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # orjson为可选依赖，未安装时回退到标准库
+    HAS_ORJSON = False
+
+# 合法JSON文本可能的首字符
+_JSON_START_CHARS = frozenset('{["-0123456789tfn')
+
+
+def quick_json_reject(text: Any) -> bool:
+    """快速判断文本是否不可能是JSON
+
+    只检查第一个非空白字符，用于在调用JSON解析器之前排除明显不是JSON的文本
+    （例如以说明性文字开头的模型回复），从而避免解析失败时的异常开销。
+
+    Args:
+        text: 待检查的文本
+
+    Returns:
+        如果文本肯定不是JSON则返回True；返回False表示仍需解析器确认
+    """
+    if not isinstance(text, str):
+        return True
+    stripped = text.lstrip()
+    return not stripped or stripped[0] not in _JSON_START_CHARS
+
+
+def loads(text: Any) -> Any:
+    """解析JSON文本，优先使用orjson
+
+    Args:
+        text: JSON字符串
+
+    Returns:
+        解析后的Python对象
+
+    Raises:
+        ValueError: 文本不是合法JSON（orjson.JSONDecodeError同样是ValueError的子类）
+    """
+    if HAS_ORJSON:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON字节串，适合直接以二进制方式写入文件
+
+    Args:
+        obj: 待序列化的对象
+        indent: 是否使用2空格缩进
+
+    Returns:
+        UTF-8编码的JSON字节串
+    """
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """序列化为JSON字符串，非ASCII字符原样输出，优先使用orjson
+
+    Args:
+        obj: 待序列化的对象
+        indent: 是否使用2空格缩进
+
+    Returns:
+        JSON字符串
+    """
+    if HAS_ORJSON:
+        return dumps_bytes(obj, indent).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
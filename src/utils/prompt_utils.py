@@ -8,11 +8,20 @@ import json
 import glob
 import re
 import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import List, Dict, Any
 
+from src.utils.json_utils import loads
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# inputs文件夹中JSON文件的总大小超过该值时使用进程池解析，否则启动进程的开销大于收益
+_PROCESS_POOL_MIN_BYTES = 8 * 1024 * 1024
+
+# 与文本模式读取文件一致的换行符：\r\n、\r和\n
+_LINE_SPLIT_RE = re.compile(r"\r\n|\r|\n")
+
 
 def load_prompts_from_file(file_path: str) -> List[str]:
     """从文件加载提示词列表
@@ -28,9 +37,11 @@ def load_prompts_from_file(file_path: str) -> List[str]:
         return []
         
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            # 每行作为一个提示词，去除空行
-            return [line.strip() for line in f if line.strip()]
+        # 整个文件一次读入并解码，再按换行切分，避免逐行迭代文本文件的开销
+        with open(file_path, "rb") as f:
+            text = f.read().decode("utf-8")
+        # 每行作为一个提示词，去除空行；每行只strip一次
+        return [line for line in map(str.strip, _LINE_SPLIT_RE.split(text)) if line]
     except Exception as e:
         logger.error(f"加载提示词文件时出错: {file_path}, 错误: {e}")
         return []
@@ -50,18 +61,23 @@ def load_prompts_from_json(json_file_path: str) -> List[str]:
         return []
         
     try:
-        with open(json_file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        # 以字节读取后直接交给解析器，省去文本层的解码（orjson直接校验UTF-8字节）
+        with open(json_file_path, "rb") as f:
+            data = loads(f.read())
             
         # 处理数据集.json格式
         if isinstance(data, list) and all(isinstance(item, dict) and "dialog" in item for item in data):
             logger.info(f"检测到对话数据集格式: {json_file_path}")
+            # 提示词文本决定响应文件名中的哈希并用于匹配数据集标签，必须保持标准库的输出格式；
+            # 复用同一个编码器，避免json.dumps在传入非默认参数时每次都新建JSONEncoder
+            encode = json.JSONEncoder(ensure_ascii=False).encode
             prompts = []
             for item in data:
                 # 只将对话内容作为提示词，不包含has_command字段
                 dialog_only = {"dialog": item["dialog"]}
-                logger.debug(f"处理对话数据: {dialog_only}")
-                prompts.append(json.dumps(dialog_only, ensure_ascii=False))
+                # 使用惰性格式化，未启用DEBUG日志时不生成对话的字符串表示
+                logger.debug("处理对话数据: %s", dialog_only)
+                prompts.append(encode(dialog_only))
             return prompts
         # 处理普通列表格式
         elif isinstance(data, list):
@@ -100,10 +116,26 @@ def load_prompts_from_inputs_folder(folder_path: str) -> List[str]:
         logger.warning(f"警告: 文件夹 '{folder_path}' 中未找到任何JSON文件")
         return []
     
-    prompts = []
     for json_file in json_files:
         logger.info(f"正在加载文件: {json_file}")
-        prompts.extend(load_prompts_from_json(json_file))
+    
+    # JSON解析受GIL限制，文件较大时用进程池并行解析，否则用线程池重叠磁盘I/O；map保持文件顺序
+    cpu_count = os.cpu_count() or 1
+    try:
+        total_bytes = sum(os.path.getsize(json_file) for json_file in json_files)
+    except OSError as e:
+        # 文件在查找后被删除或无法访问时使用线程池，由load_prompts_from_json逐个记录错误
+        logger.warning(f"获取JSON文件大小时出错: {e}")
+        total_bytes = 0
+    executor: Executor
+    if len(json_files) > 1 and cpu_count > 1 and total_bytes >= _PROCESS_POOL_MIN_BYTES:
+        executor = ProcessPoolExecutor(max_workers=min(len(json_files), cpu_count))
+    else:
+        executor = ThreadPoolExecutor(max_workers=min(8, len(json_files)))
+    prompts = []
+    with executor:
+        for file_prompts in executor.map(load_prompts_from_json, json_files):
+            prompts.extend(file_prompts)
     
     return prompts
 
@@ -26,14 +26,10 @@ def open_report_in_browser(report_path=None, output_dir="outputs"):
     """
     if report_path is None:
         # 尝试在输出目录中查找report.html文件
-        if not os.path.exists(output_dir):
-            logger.error(f"输出目录 {output_dir} 不存在")
-            return False
-            
         report_path = os.path.join(output_dir, "report.html")
         
-    # 验证报告文件是否存在
-    if not os.path.exists(report_path):
+    # 验证报告文件是否存在，输出目录不存在时报告文件同样不存在
+    if not os.path.isfile(report_path):
         logger.error(f"报告文件 {report_path} 不存在")
         return False
         
@@ -65,12 +61,12 @@ def monitor_report_changes(report_path=None, output_dir="outputs", interval=2.0)
     if report_path is None:
         report_path = os.path.join(output_dir, "report.html")
         
-    if not os.path.exists(report_path):
+    # 获取初始修改时间，同时确认文件存在
+    try:
+        last_modified = os.stat(report_path).st_mtime
+    except OSError:
         logger.error(f"报告文件 {report_path} 不存在，无法监视变化")
         return
-        
-    # 获取初始修改时间
-    last_modified = os.path.getmtime(report_path)
     
     # 首次打开报告
     open_report_in_browser(report_path)
@@ -81,7 +77,11 @@ def monitor_report_changes(report_path=None, output_dir="outputs", interval=2.0)
     try:
         while True:
             time.sleep(interval)
-            current_modified = os.path.getmtime(report_path)
+            try:
+                current_modified = os.stat(report_path).st_mtime
+            except OSError:
+                # 报告正在被重新生成时可能短暂不存在，下次再检查
+                continue
             
             if current_modified > last_modified:
                 print(f"检测到报告文件变化，刷新浏览器...")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+模型评估工具函数测试
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.utils.evaluation_utils import compute_confusion_matrix, compute_metrics, evaluate_model_predictions
+
+
+class TestConfusionMatrix(unittest.TestCase):
+    """混淆矩阵与评估指标测试类"""
+
+    def test_confusion_matrix_counts(self):
+        """测试混淆矩阵四项计数与手工计算一致"""
+        predictions = [True, True, False, False, True, False]
+        ground_truth = [True, False, True, False, True, False]
+        self.assertEqual(
+            compute_confusion_matrix(predictions, ground_truth),
+            {"TP": 2, "FP": 1, "TN": 2, "FN": 1}
+        )
+
+    def test_metrics(self):
+        """测试准确率、精确率、召回率和F1分数与手工计算一致"""
+        metrics = compute_metrics({"TP": 3, "FP": 1, "TN": 4, "FN": 2})
+        self.assertAlmostEqual(metrics["accuracy"], 7 / 10)
+        self.assertAlmostEqual(metrics["precision"], 3 / 4)
+        self.assertAlmostEqual(metrics["recall"], 3 / 5)
+        self.assertAlmostEqual(metrics["f1"], 2 * (3 / 4) * (3 / 5) / (3 / 4 + 3 / 5))
+
+    def test_metrics_without_positive_samples(self):
+        """测试没有正例时指标为0而不是除零错误"""
+        metrics = compute_metrics({"TP": 0, "FP": 0, "TN": 3, "FN": 0})
+        self.assertEqual(metrics["accuracy"], 1.0)
+        self.assertEqual(metrics["precision"], 0)
+        self.assertEqual(metrics["recall"], 0)
+        self.assertEqual(metrics["f1"], 0)
+
+
+class TestEvaluateModelPredictions(unittest.TestCase):
+    """模型预测评估测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后删除临时目录"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_dataset(self, dataset):
+        """写入数据集文件并返回路径"""
+        dataset_file = os.path.join(self.temp_dir, "dataset.json")
+        with open(dataset_file, "w", encoding="utf-8") as f:
+            json.dump(dataset, f, ensure_ascii=False)
+        return dataset_file
+
+    def test_ground_truth_from_prompt(self):
+        """测试从提示词中读取真实标签并统计各类样本"""
+        summary = [
+            {"prompt_id": 1, "prompt": '{"has_command": true}', "response": '{"has_command": true}'},
+            {"prompt_id": 2, "prompt": '{"has_command": false}', "response": '{"has_command": true}'},
+            {"prompt_id": 3, "prompt": '{"has_command": true}', "response": '{"has_command": false}'},
+            {"prompt_id": 4, "prompt": '{"has_command": false}', "response": '{"has_command": false}'},
+        ]
+        result = evaluate_model_predictions(summary)
+
+        self.assertEqual(result["confusion_matrix"], {"TP": 1, "FP": 1, "TN": 1, "FN": 1})
+        self.assertEqual([item["category"] for item in result["samples"]], ["TP", "FP", "FN", "TN"])
+        self.assertAlmostEqual(result["metrics"]["precision"], 0.5)
+        self.assertAlmostEqual(result["metrics"]["recall"], 0.5)
+
+    def test_dialog_matching_ignores_key_order(self):
+        """测试提示词中对话的键顺序与数据集不同时仍能匹配到真实标签"""
+        dataset_file = self.write_dataset([
+            {"dialog": [{"role": "user", "content": "你好"}], "has_command": False},
+            {"dialog": [{"role": "user", "content": "打开灯"}], "has_command": True},
+        ])
+        # 键顺序与数据集不同，且prompt_id对应的是另一个样本，只有按对话内容匹配才能得到正确标签
+        prompt = json.dumps({"dialog": [{"content": "打开灯", "role": "user"}]}, ensure_ascii=False)
+        summary = [{"prompt_id": 1, "prompt": prompt, "response": '{"has_command": true}'}]
+
+        result = evaluate_model_predictions(summary, dataset_file)
+
+        self.assertEqual(result["samples"][0]["ground_truth"], True)
+        self.assertEqual(result["confusion_matrix"], {"TP": 1, "FP": 0, "TN": 0, "FN": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文件处理工具函数测试
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.utils.file_utils import (
+    compute_prompt_hash, compute_legacy_prompt_hash, extract_json_from_text, write_bytes_file
+)
+
+
+class TestPromptHash(unittest.TestCase):
+    """提示词哈希测试类
+
+    响应文件名中包含提示词哈希，断点续传依赖哈希值保持不变
+    """
+
+    def test_prompt_hash_is_stable(self):
+        """测试提示词哈希（BLAKE2s，4字节摘要）的取值"""
+        self.assertEqual(compute_prompt_hash("打开客厅的灯。"), "c1c9ebd3")
+        self.assertEqual(compute_prompt_hash("hello"), "d48cef82")
+
+    def test_legacy_prompt_hash_is_md5_prefix(self):
+        """测试旧版本提示词哈希（MD5前8个字符）的取值"""
+        self.assertEqual(compute_legacy_prompt_hash("打开客厅的灯。"), "19b4e8b7")
+        self.assertEqual(compute_legacy_prompt_hash("hello"), "5d41402a")
+
+
+class TestExtractJsonFromText(unittest.TestCase):
+    """从模型回复中提取JSON测试类"""
+
+    def test_plain_json(self):
+        """测试整个回复就是JSON"""
+        self.assertEqual(extract_json_from_text('{"has_command": true}'), {"has_command": True})
+        self.assertEqual(extract_json_from_text('  {"a": {"b": 1}}\n'), {"a": {"b": 1}})
+
+    def test_json_wrapped_in_prose(self):
+        """测试JSON前后带有说明文字"""
+        text = '结果如下：\n{"has_command": false, "dialog": "你好"}\n以上。'
+        self.assertEqual(extract_json_from_text(text), {"has_command": False, "dialog": "你好"})
+
+    def test_concatenated_objects_return_first(self):
+        """测试连续输出多个对象时只取第一个"""
+        self.assertEqual(extract_json_from_text('{"a": 1}{"b": 2}'), {"a": 1})
+        self.assertEqual(extract_json_from_text('答案：{"a": 1} 备注 {x}'), {"a": 1})
+
+    def test_invalid_input(self):
+        """测试无法解析的回复返回None"""
+        self.assertIsNone(extract_json_from_text(""))
+        self.assertIsNone(extract_json_from_text("没有JSON内容"))
+        self.assertIsNone(extract_json_from_text('{"has_command": tru'))
+        self.assertIsNone(extract_json_from_text("说明 {不是JSON}"))
+
+
+class TestWriteBytesFile(unittest.TestCase):
+    """字节文件写入测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "summary.json")
+        with open(self.file_path, "wb") as f:
+            f.write(b"old")
+
+    def tearDown(self):
+        """测试后删除临时目录"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def read(self):
+        """读取目标文件内容"""
+        with open(self.file_path, "rb") as f:
+            return f.read()
+
+    def test_atomic_write_replaces_target(self):
+        """测试原子写入替换目标文件且不留下临时文件"""
+        write_bytes_file(self.file_path, b"new content", atomic=True)
+        self.assertEqual(self.read(), b"new content")
+        self.assertEqual(os.listdir(self.temp_dir), ["summary.json"])
+
+    def test_failed_atomic_write_keeps_target(self):
+        """测试原子写入失败时目标文件保持原内容且不留下临时文件"""
+        with patch("os.write", side_effect=OSError("磁盘已满")):
+            with self.assertRaises(OSError):
+                write_bytes_file(self.file_path, b"new content", atomic=True)
+        self.assertEqual(self.read(), b"old")
+        self.assertEqual(os.listdir(self.temp_dir), ["summary.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,10 +3,12 @@
 """
 Ollama客户端测试
 """
+import asyncio
 import json
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
+import aiohttp
 import pytest
 import requests
 
@@ -20,15 +22,15 @@ class TestOllamaClient(unittest.TestCase):
         """测试前准备"""
         self.client = OllamaClient(base_url="http://test-ollama:11434", timeout=10)
         
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_generate(self, mock_post):
         """测试生成方法"""
         # 模拟响应
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "message": {"content": "测试回复"}
-        }
+        }).encode("utf-8")
         mock_post.return_value = mock_response
         
         # 执行方法
@@ -44,7 +46,7 @@ class TestOllamaClient(unittest.TestCase):
         # 验证请求内容
         mock_post.assert_called_once()
         _, kwargs = mock_post.call_args
-        payload = json.loads(kwargs['json'])
+        payload = json.loads(kwargs['data'])
         
         self.assertEqual(payload['model'], "test-model")
         self.assertEqual(len(payload['messages']), 2)
@@ -53,7 +55,7 @@ class TestOllamaClient(unittest.TestCase):
         self.assertEqual(payload['messages'][1]['role'], "user")
         self.assertEqual(payload['messages'][1]['content'], "测试提示词")
         
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_generate_error(self, mock_post):
         """测试生成方法错误处理"""
         # 模拟异常
@@ -67,7 +69,7 @@ class TestOllamaClient(unittest.TestCase):
                 retry_count=1  # 设置只重试一次，加快测试速度
             )
     
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_check_model_available(self, mock_post):
         """测试模型可用性检查"""
         # 模拟响应
@@ -81,7 +83,7 @@ class TestOllamaClient(unittest.TestCase):
         # 验证结果
         self.assertTrue(available)
         
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_check_model_not_available(self, mock_post):
         """测试模型不可用性检查"""
         # 模拟响应
@@ -117,18 +119,18 @@ class TestOllamaClient(unittest.TestCase):
         result = self.client._apply_precision_bias(content, 0.0)
         self.assertEqual(result, content)
         
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_models(self, mock_get):
         """测试获取模型列表"""
         # 模拟响应
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "models": [
                 {"name": "model1"},
                 {"name": "model2"}
             ]
-        }
+        }).encode("utf-8")
         mock_get.return_value = mock_response
         
         # 执行方法
@@ -152,7 +154,7 @@ async def test_generate_async():
         mock_response.__aenter__.return_value = mock_response
         mock_response.status_code = 200
         mock_response.raise_for_status = MagicMock()
-        mock_response.json = MagicMock()
+        mock_response.json = AsyncMock()
         mock_response.json.return_value = {"message": {"content": "异步测试回复"}}
         
         # 设置mock返回值
@@ -187,14 +189,11 @@ async def test_generate_stream():
         # 模拟流式内容
         mock_content = MagicMock()
         # 模拟异步迭代器
-        async def mock_aiter():
-            for text in [
-                b'{"message": {"content": "segment1"}}',
-                b'{"message": {"content": "segment2"}}',
-                b'{"done": true}'
-            ]:
-                yield text
-        mock_content.__aiter__.return_value = mock_aiter()
+        mock_content.__aiter__.return_value = [
+            b'{"message": {"content": "segment1"}}',
+            b'{"message": {"content": "segment2"}}',
+            b'{"done": true}'
+        ]
         mock_response.content = mock_content
         
         # 设置mock返回值
@@ -215,5 +214,88 @@ async def test_generate_stream():
         await client.close_session()
 
 
+@pytest.mark.asyncio
+async def test_generate_async_timeout_not_retried():
+    """测试异步生成超时时不重发请求"""
+    client = OllamaClient(base_url="http://test-ollama:11434")
+    
+    with patch('aiohttp.ClientSession.post') as mock_post:
+        # 模拟请求超时
+        mock_post.side_effect = asyncio.TimeoutError()
+        
+        # 超时直接抛出异常，不进行重试
+        with pytest.raises(OllamaException) as exc_info:
+            await client.generate_async(
+                model="test-model", 
+                prompt="超时测试提示词",
+                retry_delay=0
+            )
+        assert mock_post.call_count == 1
+        assert exc_info.value.overloaded
+        
+        # 关闭会话
+        await client.close_session()
+
+
+@pytest.mark.asyncio
+async def test_generate_async_retry_after_is_clamped():
+    """测试按Retry-After重试时的等待时间不超过上限"""
+    client = OllamaClient(base_url="http://test-ollama:11434", max_retry_delay=0.01)
+    
+    with patch('aiohttp.ClientSession.post') as mock_post, \
+            patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        # 模拟服务端过载，要求等待一天后重试
+        mock_post.side_effect = aiohttp.ClientResponseError(
+            request_info=MagicMock(), history=(), status=429,
+            headers={"Retry-After": "86400"}
+        )
+        
+        with pytest.raises(OllamaException):
+            await client.generate_async(
+                model="test-model", 
+                prompt="过载测试提示词",
+                retry_count=2,
+                retry_delay=0
+            )
+        
+        # 等待时间被限制在max_retry_delay以内
+        mock_sleep.assert_awaited_once_with(0.01)
+        
+        # 关闭会话
+        await client.close_session()
+
+
+@pytest.mark.asyncio
+async def test_generate_async_client_error_is_not_overload():
+    """测试请求本身有误（如模型不存在）时不视为服务端过载"""
+    client = OllamaClient(base_url="http://test-ollama:11434")
+    
+    with patch('aiohttp.ClientSession.post') as mock_post:
+        # 模拟模型不存在
+        mock_post.side_effect = aiohttp.ClientResponseError(
+            request_info=MagicMock(), history=(), status=404
+        )
+        
+        with pytest.raises(OllamaException) as exc_info:
+            await client.generate_async(
+                model="missing-model", 
+                prompt="测试提示词",
+                retry_count=1
+            )
+        assert not exc_info.value.overloaded
+        
+        # 返回完整响应时在错误信息中标明是否过载
+        result = await client.generate_async(
+            model="missing-model", 
+            prompt="测试提示词",
+            return_full_response=True,
+            retry_count=1
+        )
+        assert result["overloaded"] is False
+        
+        # 关闭会话
+        await client.close_session()
+
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
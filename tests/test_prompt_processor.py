@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+提示词处理服务测试
+"""
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from src.config.settings import settings
+from src.ollama_client import OllamaException
+from src.services.prompt_processor import PromptProcessorService
+from src.utils.file_utils import compute_prompt_hash, compute_legacy_prompt_hash
+
+
+class FakeAsyncClient:
+    """模拟的Ollama异步客户端，记录收到的提示词"""
+
+    def __init__(self, fail_prompts=(), overload_prompts=()):
+        """初始化模拟客户端
+
+        Args:
+            fail_prompts: 需要模拟请求失败（如模型不存在）的提示词
+            overload_prompts: 需要模拟服务端过载（429/5xx或超时）的提示词
+        """
+        self.calls = []
+        self.fail_prompts = set(fail_prompts)
+        self.overload_prompts = set(overload_prompts)
+
+    async def generate_async(self, model, prompt, system_prompt=None, **kwargs):
+        """模拟异步生成，返回JSON格式的回复"""
+        self.calls.append(prompt)
+        if prompt in self.fail_prompts:
+            raise OllamaException("模拟请求失败")
+        if prompt in self.overload_prompts:
+            raise OllamaException("模拟服务端过载", overloaded=True)
+        return json.dumps({"has_command": "灯" in prompt}, ensure_ascii=False)
+
+    async def close_session(self):
+        """模拟关闭会话"""
+        pass
+
+
+class PromptProcessorTestCase(unittest.TestCase):
+    """提示词处理测试基类，为每个测试准备独立的输出目录和配置"""
+
+    def setUp(self):
+        """测试前准备"""
+        self._saved_settings = dict(vars(settings))
+        self.output_dir = tempfile.mkdtemp()
+        settings.dataset_file = None
+        settings.delay = 0.0
+        settings.adaptive_delay = False
+        settings.workers = 0
+        settings.save_summary = True
+        settings.resume_from_checkpoint = True
+        settings.save_raw_response = False
+        settings.aggregate_responses = False
+        settings.pretty_responses = False
+        settings.pretty_summary = True
+
+    def tearDown(self):
+        """测试后恢复配置并删除输出目录"""
+        vars(settings).clear()
+        vars(settings).update(self._saved_settings)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def run_prompts(self, prompts, client=None):
+        """使用模拟客户端处理提示词
+
+        Returns:
+            (模拟客户端, 处理结果)
+        """
+        client = client or FakeAsyncClient()
+        result = PromptProcessorService(client=client).process_prompts(
+            "test-model", "系统提示词", prompts, output_dir=self.output_dir
+        )
+        return client, result
+
+    def response_files(self):
+        """返回输出目录中的响应文件名列表"""
+        return sorted(name for name in os.listdir(self.output_dir) if name.startswith("response_"))
+
+
+class TestDuplicatePrompts(PromptProcessorTestCase):
+    """重复提示词处理测试类"""
+
+    def test_duplicate_prompts_call_model_once(self):
+        """测试相同提示词只请求一次模型"""
+        prompts = ["打开灯", "你好", "打开灯", "你好", "打开灯"]
+        client, result = self.run_prompts(prompts)
+
+        # 每个不同的提示词只请求一次
+        self.assertEqual(sorted(client.calls), ["你好", "打开灯"])
+
+        # 每个提示词ID都有一个摘要条目
+        summary = result["summary"]
+        self.assertEqual([item["prompt_id"] for item in summary], [1, 2, 3, 4, 5])
+        self.assertEqual([item["prompt"] for item in summary], prompts)
+
+        # 重复的提示词共用第一次出现时的响应文件
+        self.assertEqual(summary[2]["output_file"], summary[0]["output_file"])
+        self.assertEqual(summary[4]["output_file"], summary[0]["output_file"])
+        self.assertEqual(summary[3]["output_file"], summary[1]["output_file"])
+        self.assertEqual(summary[2]["response"], summary[0]["response"])
+        self.assertEqual(len(self.response_files()), 2)
+
+    def test_resume_after_duplicates_does_not_call_model(self):
+        """测试续跑时重复的提示词不会再次请求模型"""
+        prompts = ["打开灯", "你好", "打开灯"]
+        self.run_prompts(prompts)
+
+        # 摘要完整时直接跳过
+        client, result = self.run_prompts(prompts)
+        self.assertEqual(client.calls, [])
+        self.assertEqual(len(result["summary"]), 3)
+
+        # 摘要丢失时按提示词哈希找到共用的响应文件
+        os.remove(os.path.join(self.output_dir, "summary.json"))
+        client, result = self.run_prompts(prompts)
+        self.assertEqual(client.calls, [])
+        self.assertEqual([item["prompt_id"] for item in result["summary"]], [1, 2, 3])
+
+
+class TestOutputFormat(PromptProcessorTestCase):
+    """输出文件格式测试类"""
+
+    def read_output(self, name):
+        """读取输出目录中的文件内容"""
+        with open(os.path.join(self.output_dir, name), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_default_format(self):
+        """测试默认响应文件为紧凑格式，summary.json为缩进格式"""
+        self.run_prompts(["打开灯"])
+
+        self.assertEqual(self.read_output(self.response_files()[0]), '{"has_command":true}')
+        summary_text = self.read_output("summary.json")
+        self.assertIn('\n  {\n    "prompt_id": 1', summary_text)
+
+    def test_pretty_responses_and_compact_summary(self):
+        """测试分别设置响应文件和summary.json的格式"""
+        settings.pretty_responses = True
+        settings.pretty_summary = False
+        self.run_prompts(["打开灯"])
+
+        self.assertEqual(self.read_output(self.response_files()[0]), '{\n  "has_command": true\n}')
+        self.assertNotIn("\n", self.read_output("summary.json"))
+
+
+class TestLegacyResponseFiles(PromptProcessorTestCase):
+    """旧版本响应文件兼容测试类"""
+
+    def test_resume_finds_legacy_md5_response_file(self):
+        """测试续跑时能找到以MD5哈希命名的旧响应文件"""
+        legacy_file = os.path.join(
+            self.output_dir, f"response_1_{compute_legacy_prompt_hash('打开灯')}.json"
+        )
+        with open(legacy_file, "w", encoding="utf-8") as f:
+            f.write('{"has_command": true}')
+
+        client, result = self.run_prompts(["打开灯", "你好"])
+
+        # 旧响应文件对应的提示词不再请求模型
+        self.assertEqual(client.calls, ["你好"])
+        summary = result["summary"]
+        self.assertEqual(summary[0]["output_file"], legacy_file)
+        self.assertEqual(summary[0]["response"], '{"has_command": true}')
+        # 新生成的响应文件使用BLAKE2s哈希命名
+        self.assertTrue(summary[1]["output_file"].endswith(f"_{compute_prompt_hash('你好')}.json"))
+
+
+class TestCheckpoint(PromptProcessorTestCase):
+    """增量检查点测试类"""
+
+    def write_checkpoint(self, lines):
+        """写入增量检查点文件"""
+        with open(os.path.join(self.output_dir, "summary.jsonl"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+    def test_resume_from_checkpoint_with_truncated_line(self):
+        """测试从最后一行不完整的检查点恢复"""
+        entries = [
+            {"prompt_id": 1, "prompt": "打开灯", "prompt_hash": "", "response": "已恢复1", "output_file": ""},
+            {"prompt_id": 2, "prompt": "你好", "prompt_hash": "", "response": "已恢复2", "output_file": ""},
+        ]
+        lines = [json.dumps(entry, ensure_ascii=False) for entry in entries]
+        # 中断时留下的不完整的最后一行
+        lines.append('{"prompt_id": 3, "prom')
+        self.write_checkpoint(lines)
+
+        client, result = self.run_prompts(["打开灯", "你好", "关灯"])
+
+        # 只有检查点中没有完整记录的提示词需要请求模型
+        self.assertEqual(client.calls, ["关灯"])
+        summary = result["summary"]
+        self.assertEqual([item["prompt_id"] for item in summary], [1, 2, 3])
+        self.assertEqual(summary[0]["response"], "已恢复1")
+        self.assertEqual(summary[1]["response"], "已恢复2")
+
+        # summary.json写入成功后删除检查点
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, "summary.json")))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "summary.jsonl")))
+
+    def test_resume_skips_lines_that_are_not_summary_items(self):
+        """测试跳过检查点中合法但不是摘要条目的行，不影响后续行的恢复"""
+        entry = {"prompt_id": 2, "prompt": "你好", "prompt_hash": "", "response": "已恢复2", "output_file": ""}
+        self.write_checkpoint(["null", "12", '{"prompt": "打开灯"}', json.dumps(entry, ensure_ascii=False)])
+
+        client, result = self.run_prompts(["打开灯", "你好"])
+
+        self.assertEqual(client.calls, ["打开灯"])
+        summary = result["summary"]
+        self.assertEqual([item["prompt_id"] for item in summary], [1, 2])
+        self.assertEqual(summary[1]["response"], "已恢复2")
+
+    def test_checkpoint_kept_when_summary_save_fails(self):
+        """测试摘要保存失败时保留检查点"""
+        with patch.object(PromptProcessorService, "_save_summary", return_value=False):
+            self.run_prompts(["打开灯", "你好"])
+
+        checkpoint_file = os.path.join(self.output_dir, "summary.jsonl")
+        self.assertTrue(os.path.exists(checkpoint_file))
+        with open(checkpoint_file, "r", encoding="utf-8") as f:
+            ids = sorted(json.loads(line)["prompt_id"] for line in f)
+        self.assertEqual(ids, [1, 2])
+
+    def test_no_checkpoint_left_when_all_prompts_fail(self):
+        """测试全部提示词失败时不留下空的检查点"""
+        client = FakeAsyncClient(fail_prompts={"打开灯", "你好"})
+        _, result = self.run_prompts(["打开灯", "你好"], client=client)
+
+        self.assertEqual(result["summary"], [])
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "summary.jsonl")))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "summary.json")))
+
+
+class TestAggregateResponses(PromptProcessorTestCase):
+    """汇总模式测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        settings.aggregate_responses = True
+
+    def test_aggregate_mode_writes_no_response_files(self):
+        """测试汇总模式下响应只写入摘要"""
+        client, result = self.run_prompts(["打开灯", "你好"])
+
+        self.assertEqual(self.response_files(), [])
+        self.assertEqual([item["output_file"] for item in result["summary"]], ["", ""])
+        with open(os.path.join(self.output_dir, "summary.json"), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        self.assertEqual(json.loads(saved[0]["response"]), {"has_command": True})
+
+    def test_aggregate_resume_skips_directory_scan(self):
+        """测试汇总模式续跑时不扫描响应文件"""
+        self.run_prompts(["打开灯"])
+
+        with patch("src.services.prompt_processor.get_existing_responses") as mock_scan:
+            client, result = self.run_prompts(["打开灯", "你好"])
+
+        mock_scan.assert_not_called()
+        self.assertEqual(client.calls, ["你好"])
+        self.assertEqual([item["prompt_id"] for item in result["summary"]], [1, 2])
+
+    def test_aggregate_without_summary_writes_response_files(self):
+        """测试关闭摘要时汇总模式回退为单独保存响应文件"""
+        settings.save_summary = False
+        _, result = self.run_prompts(["打开灯", "你好"])
+
+        self.assertEqual(len(self.response_files()), 2)
+        self.assertTrue(all(item["output_file"] for item in result["summary"]))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "summary.json")))
+
+
+class TestAdaptiveDelay(PromptProcessorTestCase):
+    """自适应请求间隔测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        settings.adaptive_delay = True
+        self.service = PromptProcessorService(client=FakeAsyncClient())
+        self.service._request_interval = 0.0
+
+    def test_failure_doubles_interval_up_to_cap(self):
+        """测试失败时请求间隔加倍，且不超过上限"""
+        self.service._record_request_result(False)
+        self.assertAlmostEqual(self.service._request_interval, 0.1)
+        self.service._record_request_result(False)
+        self.assertAlmostEqual(self.service._request_interval, 0.2)
+
+        self.service._request_interval = 20.0
+        self.service._record_request_result(False)
+        self.assertEqual(self.service._request_interval, 30.0)
+        self.service._record_request_result(False)
+        self.assertEqual(self.service._request_interval, 30.0)
+
+    def test_success_streak_halves_interval_then_snaps_to_zero(self):
+        """测试连续成功8次后请求间隔减半，低于0.1秒时归零"""
+        self.service._request_interval = 0.4
+        for _ in range(7):
+            self.service._record_request_result(True)
+        self.assertAlmostEqual(self.service._request_interval, 0.4)
+        self.service._record_request_result(True)
+        self.assertAlmostEqual(self.service._request_interval, 0.2)
+
+        for _ in range(8):
+            self.service._record_request_result(True)
+        self.assertAlmostEqual(self.service._request_interval, 0.1)
+        for _ in range(8):
+            self.service._record_request_result(True)
+        self.assertEqual(self.service._request_interval, 0.0)
+
+    def test_failure_resets_success_streak(self):
+        """测试失败会重新开始计算连续成功次数"""
+        self.service._request_interval = 0.4
+        for _ in range(7):
+            self.service._record_request_result(True)
+        self.service._record_request_result(False)
+        self.assertAlmostEqual(self.service._request_interval, 0.8)
+        for _ in range(7):
+            self.service._record_request_result(True)
+        self.assertAlmostEqual(self.service._request_interval, 0.8)
+
+    def test_fixed_delay_is_not_adjusted(self):
+        """测试未开启自适应模式时请求间隔保持不变"""
+        settings.adaptive_delay = False
+        self.service._request_interval = 0.5
+        self.service._record_request_result(False)
+        for _ in range(8):
+            self.service._record_request_result(True)
+        self.assertEqual(self.service._request_interval, 0.5)
+
+    def test_only_overload_failures_increase_interval(self):
+        """测试请求本身有误时不降速，只有服务端过载时请求间隔才增加"""
+        service = PromptProcessorService(client=FakeAsyncClient(fail_prompts=["不存在的模型"]))
+        service._request_interval = 0.0
+        service.process_prompts("test-model", "系统提示词", ["不存在的模型"], output_dir=self.output_dir)
+        self.assertEqual(service._request_interval, 0.0)
+
+        service = PromptProcessorService(client=FakeAsyncClient(overload_prompts=["服务端过载"]))
+        service._request_interval = 0.0
+        service.process_prompts("test-model", "系统提示词", ["服务端过载"], output_dir=self.output_dir)
+        self.assertAlmostEqual(service._request_interval, 0.1)
+
+    def test_wait_for_rate_limit_spaces_request_starts(self):
+        """测试相邻请求的发起间隔不小于当前请求间隔"""
+        self.service._request_interval = 0.05
+
+        async def start_requests():
+            for _ in range(3):
+                await self.service._wait_for_rate_limit()
+
+        start = time.monotonic()
+        asyncio.run(start_requests())
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+class TestEventLoopEntryPoints(PromptProcessorTestCase):
+    """同步与异步入口测试类"""
+
+    def test_process_prompts_async_in_running_loop(self):
+        """测试在已运行的事件循环中使用异步入口"""
+        client = FakeAsyncClient()
+
+        async def run():
+            return await PromptProcessorService(client=client).process_prompts_async(
+                "test-model", "系统提示词", ["打开灯", "你好"], output_dir=self.output_dir
+            )
+
+        result = asyncio.run(run())
+        self.assertEqual(sorted(client.calls), ["你好", "打开灯"])
+        self.assertEqual([item["prompt_id"] for item in result["summary"]], [1, 2])
+
+    def test_process_prompts_in_running_loop_raises(self):
+        """测试在已运行的事件循环中调用同步入口时给出明确错误"""
+        client = FakeAsyncClient()
+
+        async def run():
+            with self.assertRaisesRegex(RuntimeError, "process_prompts_async"):
+                PromptProcessorService(client=client).process_prompts(
+                    "test-model", "系统提示词", ["打开灯"], output_dir=self.output_dir
+                )
+
+        asyncio.run(run())
+        self.assertEqual(client.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+提示词处理工具函数测试
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.utils.prompt_utils import load_prompts_from_file
+
+
+class TestLoadPromptsFromFile(unittest.TestCase):
+    """从文本文件加载提示词测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后删除临时目录"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def load(self, data):
+        """写入提示词文件的原始字节并加载"""
+        file_path = os.path.join(self.temp_dir, "prompts.txt")
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return load_prompts_from_file(file_path)
+
+    def test_line_endings(self):
+        """测试LF、CRLF和仅CR换行都按行切分，空行和首尾空白被去除"""
+        expected = ["打开灯", "你好", "关灯"]
+        self.assertEqual(self.load("打开灯\n你好\n\n 关灯 \n".encode("utf-8")), expected)
+        self.assertEqual(self.load("打开灯\r\n你好\r\n\r\n 关灯 \r\n".encode("utf-8")), expected)
+        self.assertEqual(self.load("打开灯\r你好\r\r 关灯 \r".encode("utf-8")), expected)
+        self.assertEqual(self.load("打开灯\r\n你好\r关灯\n".encode("utf-8")), expected)
+
+    def test_unicode_line_separator_is_not_split(self):
+        """测试提示词中的U+2028不作为换行符，与文本模式逐行读取一致"""
+        prompts = self.load("第一行\u2028仍是第一行\n第二行\n".encode("utf-8"))
+        self.assertEqual(prompts, ["第一行\u2028仍是第一行", "第二行"])
+
+    def test_missing_file(self):
+        """测试文件不存在时返回空列表"""
+        self.assertEqual(load_prompts_from_file(os.path.join(self.temp_dir, "missing.txt")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTML报告模板测试
+"""
+import json
+import unittest
+
+from src.templates.report_template import generate_html_report_content
+
+# 报告中嵌入结果数据的<script>标签
+_DATA_OPEN = '<script id="report-data" type="application/json">'
+
+
+class TestReportDataBlock(unittest.TestCase):
+    """报告数据块嵌入测试类"""
+
+    def test_payload_cannot_break_out_of_script(self):
+        """测试包含</script>、<!--和U+2028的内容不会提前结束数据块，且能原样还原"""
+        response = '</script><script>alert(1)</script><!-- 注释\u2028换行'
+        summary = [
+            {"prompt_id": 1, "prompt": "</SCRIPT> <!--", "response": response, "output_file": ""},
+            {"prompt_id": 2, "prompt": "打开灯", "response": '{"dialog": "</script>"}', "output_file": ""},
+        ]
+        html = generate_html_report_content(summary, "test-model", "系统提示词")
+
+        # 数据块在第一个</script>处结束，之后紧跟渲染脚本
+        start = html.index(_DATA_OPEN) + len(_DATA_OPEN)
+        end = html.index("</script>", start)
+        data_block = html[start:end]
+        self.assertNotIn("<", data_block)
+        self.assertTrue(html[end:].startswith("</script>\n    <script>"))
+
+        # 浏览器端JSON.parse得到的内容与原始数据一致
+        rows = json.loads(data_block)
+        self.assertEqual(rows[0]["prompt"], "</SCRIPT> <!--")
+        self.assertEqual(rows[0]["response"], response)
+        self.assertFalse(rows[0]["is_json"])
+        self.assertEqual(rows[1]["response"], {"dialog": "</script>"})
+        self.assertTrue(rows[1]["is_json"])
+
+
+if __name__ == "__main__":
+    unittest.main()